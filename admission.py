@@ -0,0 +1,165 @@
+"""Admission control for command requests: per-session rate limits and fair scheduling.
+
+Every command has a cost in the registry (1 for cheap commands, more for ones
+that walk or modify directory trees); a request costs the sum of its commands.
+
+- RateLimiter: a token bucket per session, refilled at PYTERM_RATE_LIMIT cost
+  units per second up to PYTERM_RATE_BURST. A request that doesn't fit is
+  rejected (429) without running anything or using up tokens; one costing
+  more than the burst can never fit and is always rejected.
+- FairScheduler: at most PYTERM_SCHEDULER_SLOTS commands run at once. When
+  requests have to wait, they are admitted by start-time fair queuing: each
+  session's requests are tagged with a virtual start time that advances by
+  their cost, so a session with many queued requests only gets its turn
+  between the requests of other sessions, and expensive commands count for more.
+
+Both are per process; with several gunicorn workers each enforces its own limits.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from cache import LRUCache
+
+RATE_LIMIT = float(os.environ.get('PYTERM_RATE_LIMIT', 10))
+RATE_BURST = float(os.environ.get('PYTERM_RATE_BURST', 30))
+RATE_LIMIT_SESSIONS = int(os.environ.get('PYTERM_RATE_LIMIT_SESSIONS', 10000))
+SCHEDULER_SLOTS = int(os.environ.get('PYTERM_SCHEDULER_SLOTS', 4))
+SCHEDULER_TIMEOUT = float(os.environ.get('PYTERM_SCHEDULER_TIMEOUT', 10))
+
+
+class RateLimiter:
+    """Token bucket per key; rate 0 disables limiting"""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_keys=RATE_LIMIT_SESSIONS):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        # Buckets of idle sessions are dropped first; a new bucket starts full anyway
+        self._buckets = LRUCache(max_keys)  # key -> [tokens, monotonic time of the last update]
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def take(self, key, cost=1):
+        """Take cost tokens from key's bucket.
+
+        Returns 0 if admitted, else seconds until it would be, or None if cost exceeds the burst.
+        """
+        if self.rate <= 0:
+            return 0.0
+        if cost > self.burst:
+            with self._lock:
+                self.rejected += 1
+            return None
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets.put(key, bucket)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                self.admitted += 1
+                return 0.0
+            self.rejected += 1
+            return (cost - bucket[0]) / self.rate
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "sessions": len(self._buckets),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class SchedulerBusy(Exception):
+    """A request waited longer than the scheduler timeout for a slot"""
+
+
+class FairScheduler:
+    """Runs at most `slots` commands at once, admitting waiting sessions in fair order; 0 slots disables it"""
+
+    def __init__(self, slots=SCHEDULER_SLOTS, timeout=SCHEDULER_TIMEOUT):
+        self.slots = slots
+        self.timeout = timeout
+        self.running = 0
+        self._vtime = 0.0  # start tag of the last admitted request
+        self._finish = {}  # key -> finish tag of its last request
+        self._waiting = []  # heap of [start tag, sequence, admitted event, cancelled]
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.timeouts = 0
+
+    @contextmanager
+    def slot(self, key, cost=1):
+        """Hold a slot while the block runs; raises SchedulerBusy after waiting too long"""
+        if self.slots <= 0:
+            yield
+            return
+        self._acquire(key, cost)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, key, cost):
+        with self._lock:
+            start = max(self._vtime, self._finish.get(key, 0.0))
+            self._finish[key] = start + cost
+            if self.running < self.slots and not self._waiting:
+                self._admit(start)
+                return
+            self.queued += 1
+            ticket = [start, next(self._sequence), threading.Event(), False]
+            heapq.heappush(self._waiting, ticket)
+        # Released slots are handed to the first waiter directly, so only it wakes up
+        if ticket[2].wait(self.timeout):
+            return
+        with self._lock:
+            if ticket[2].is_set():
+                return
+            ticket[3] = True
+            self.timeouts += 1
+        raise SchedulerBusy(f"Server busy: waited {self.timeout:g}s for a free slot")
+
+    def _release(self):
+        with self._lock:
+            self.running -= 1
+            while self._waiting and self.running < self.slots:
+                ticket = heapq.heappop(self._waiting)
+                if not ticket[3]:
+                    self._admit(ticket[0])
+                    ticket[2].set()
+
+    def _admit(self, start):
+        self.running += 1
+        self.admitted += 1
+        self._vtime = max(self._vtime, start)
+        if len(self._finish) > 4096:
+            # Sessions whose last request finished before the current virtual time start from it anyway
+            self._finish = {k: f for k, f in self._finish.items() if f > self._vtime}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "running": self.running,
+                "waiting": sum(1 for ticket in self._waiting if not ticket[3]),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+            }
+
+
+# Limits of this process, shared by all sessions
+rate_limiter = RateLimiter()
+scheduler = FairScheduler()
@@ -1,285 +1,33 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
+import hmac
+import json
+import math
 import os
-import shutil
-import tempfile
 import uuid
-import platform
-from main import interpret_command
+from main import cached_interpret_command, interpret_cache
+from session_store import SessionStore
+from filesystem import FileSystemManager
+from admission import SchedulerBusy, rate_limiter, scheduler
+from commands import split_chain, is_blocking, command_cost
+import compact
+from completion import complete
+from history import expand_recall
+from metrics import metrics
+from profiler import profiler
+from listing_cache import listing_cache
+from session_state import create_state_backend
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this in production
 
-# Store user sessions and their virtual file systems
-user_sessions = {}
-
-# Detect if we're running on a serverless platform or locally
-def is_serverless_environment():
-    """Detect if running on serverless platform (Vercel, Heroku, etc.)"""
-    return (
-        os.environ.get('VERCEL') or 
-        os.environ.get('DYNO') or 
-        os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or
-        '/var/task' in os.getcwd() or
-        '/tmp' in tempfile.gettempdir() or
-        os.access(os.getcwd(), os.W_OK) == False
-    )
+# Store user sessions and their virtual file systems (bounded, idle sessions are evicted)
+user_sessions = SessionStore()
 
-class FileSystemManager:
-    def __init__(self):
-        self.is_serverless = is_serverless_environment()
-        if self.is_serverless:
-            # Virtual file system for serverless
-            self.base_dir = tempfile.mkdtemp()
-            self.current_dir = self.base_dir
-            self.mode = "SANDBOX"
-        else:
-            # Real file system for local
-            self.base_dir = os.getcwd()
-            self.current_dir = self.base_dir
-            self.mode = "REAL OS"
-        
-        self.history = []
-        
-    def get_relative_path(self):
-        """Get the current path relative to the base directory"""
-        if self.current_dir == self.base_dir:
-            return "~"
-        try:
-            rel_path = os.path.relpath(self.current_dir, self.base_dir)
-            return f"~/{rel_path}"
-        except ValueError:
-            # Handle different drives on Windows
-            return self.current_dir
-    
-    def get_mode_info(self):
-        """Get information about current mode"""
-        if self.is_serverless:
-            return {
-                "mode": "SANDBOX",
-                "description": "Virtual file system - safe for demonstrations",
-                "warning": "Files are temporary and will be lost when session ends"
-            }
-        else:
-            return {
-                "mode": "REAL OS",
-                "description": "Direct access to your actual file system",
-                "warning": "Commands will create/modify real files on your computer"
-            }
-    
-    def is_path_safe(self, path):
-        """Check if path is safe for operations"""
-        if self.is_serverless:
-            # In serverless, restrict to temp directory
-            abs_path = os.path.abspath(os.path.join(self.current_dir, path))
-            return abs_path.startswith(self.base_dir)
-        else:
-            # Local mode - more permissive but still some restrictions
-            restricted_paths = [
-                '/etc', '/sys', '/proc', '/dev', 
-                'C:\\Windows', 'C:\\System32', 'C:\\Program Files'
-            ]
-            abs_path = os.path.abspath(os.path.join(self.current_dir, path))
-            return not any(abs_path.startswith(restricted) for restricted in restricted_paths)
-    
-    def execute_command(self, command_str):
-        """Execute a command in the file system"""
-        try:
-            if not command_str.strip():
-                return {"output": "", "error": "", "success": True}
-            
-            parts = command_str.split()
-            command = parts[0]
-            args = parts[1:] if len(parts) > 1 else []
-            
-            if command == "pwd":
-                if self.is_serverless:
-                    return {"output": self.get_relative_path(), "error": "", "success": True}
-                else:
-                    return {"output": os.getcwd(), "error": "", "success": True}
-            
-            elif command == "ls":
-                try:
-                    items = os.listdir(self.current_dir)
-                    if not items:
-                        return {"output": "(empty directory)", "error": "", "success": True}
-                    output = "\n".join(sorted(items))
-                    return {"output": output, "error": "", "success": True}
-                except Exception as e:
-                    return {"output": "", "error": f"Error: {str(e)}", "success": False}
-            
-            elif command == "cd":
-                try:
-                    if not args:
-                        if self.is_serverless:
-                            self.current_dir = self.base_dir
-                        else:
-                            self.current_dir = os.path.expanduser('~')
-                            os.chdir(self.current_dir)
-                        return {"output": "", "error": "", "success": True}
-                    
-                    target = args[0].strip('"\'')
-                    if target == "..":
-                        parent = os.path.dirname(self.current_dir)
-                        if self.is_serverless:
-                            # Don't go above base directory in serverless
-                            if len(parent) >= len(self.base_dir):
-                                self.current_dir = parent
-                        else:
-                            self.current_dir = parent
-                            os.chdir(self.current_dir)
-                    elif target == "~":
-                        if self.is_serverless:
-                            self.current_dir = self.base_dir
-                        else:
-                            self.current_dir = os.path.expanduser('~')
-                            os.chdir(self.current_dir)
-                    else:
-                        new_path = os.path.join(self.current_dir, target)
-                        if os.path.exists(new_path) and os.path.isdir(new_path):
-                            if self.is_path_safe(target):
-                                self.current_dir = os.path.abspath(new_path)
-                                if not self.is_serverless:
-                                    os.chdir(self.current_dir)
-                            else:
-                                return {"output": "", "error": f"Error: Access denied to {target}", "success": False}
-                        else:
-                            return {"output": "", "error": f"Error: Directory not found: {target}", "success": False}
-                    
-                    return {"output": "", "error": "", "success": True}
-                except Exception as e:
-                    return {"output": "", "error": f"Error: {str(e)}", "success": False}
-            
-            elif command == "mkdir":
-                try:
-                    if not args:
-                        return {"output": "", "error": "Error: Please specify a directory name.", "success": False}
-                    
-                    dir_name = args[0].strip('"\'')
-                    if not self.is_path_safe(dir_name):
-                        return {"output": "", "error": f"Error: Access denied to {dir_name}", "success": False}
-                    
-                    new_path = os.path.join(self.current_dir, dir_name)
-                    os.makedirs(new_path, exist_ok=False)
-                    return {"output": f"Directory '{dir_name}' created.", "error": "", "success": True}
-                except FileExistsError:
-                    return {"output": "", "error": f"Error: Directory already exists: {args[0]}", "success": False}
-                except PermissionError:
-                    if self.is_serverless:
-                        return {"output": "", "error": "Error: File system is read-only in demo mode. Download local version for full functionality.", "success": False}
-                    else:
-                        return {"output": "", "error": f"Error: Permission denied", "success": False}
-                except Exception as e:
-                    return {"output": "", "error": f"Error: {str(e)}", "success": False}
-            
-            elif command == "rm":
-                try:
-                    if not args:
-                        return {"output": "", "error": "Error: Please specify a file or directory to remove.", "success": False}
-                    
-                    target = args[0].strip('"\'')
-                    if not self.is_path_safe(target):
-                        return {"output": "", "error": f"Error: Access denied to {target}", "success": False}
-                    
-                    target_path = os.path.join(self.current_dir, target)
-                    
-                    if os.path.isfile(target_path):
-                        os.remove(target_path)
-                        return {"output": f"File '{target}' removed.", "error": "", "success": True}
-                    elif os.path.isdir(target_path):
-                        shutil.rmtree(target_path)
-                        return {"output": f"Directory '{target}' removed.", "error": "", "success": True}
-                    else:
-                        return {"output": "", "error": f"Error: File or directory not found: {target}", "success": False}
-                except PermissionError:
-                    if self.is_serverless:
-                        return {"output": "", "error": "Error: File system is read-only in demo mode. Download local version for full functionality.", "success": False}
-                    else:
-                        return {"output": "", "error": f"Error: Permission denied", "success": False}
-                except Exception as e:
-                    return {"output": "", "error": f"Error: {str(e)}", "success": False}
-            
-            elif command == "history":
-                if not self.history:
-                    return {"output": "(no commands in history)", "error": "", "success": True}
-                output = "\n".join([f"{i+1:>3}: {cmd}" for i, cmd in enumerate(self.history)])
-                return {"output": output, "error": "", "success": True}
-            
-            elif command == "clear":
-                return {"output": "CLEAR_TERMINAL", "error": "", "success": True}
-            
-            elif command == "mode":
-                mode_info = self.get_mode_info()
-                output = f"Mode: {mode_info['mode']}\n"
-                output += f"Description: {mode_info['description']}\n"
-                output += f"Note: {mode_info['warning']}"
-                return {"output": output, "error": "", "success": True}
-            
-            elif command == "help":
-                mode_info = self.get_mode_info()
-                help_text = f"""Available commands:
-ls - List files and directories
-cd <directory> - Change directory
-pwd - Show current directory
-mkdir <name> - Create a directory
-rm <path> - Remove file or directory
-history - Show command history
-clear - Clear terminal
-mode - Show current mode information
-sysinfo - Show system information
-help - Show this help message
-
-Current Mode: {mode_info['mode']}
-{mode_info['description']}
-
-You can also use natural language! Try:
-- "show me what's in this directory"
-- "create a folder called test"
-- "go to the documents folder"
-- "go back" or "go up" (same as cd ..)
-- "where am I right now?"
-- "delete the temp folder"
-- "show system info" or "computer info"
-
-{'Note: ' + mode_info['warning']}"""
-                return {"output": help_text, "error": "", "success": True}
-            
-            elif command == "sysinfo":
-                try:
-                    if self.is_serverless:
-                        # Limited system info for serverless environment
-                        output = "--- System Information (Serverless) ---\n"
-                        output += f"Platform: {platform.system()}\n"
-                        output += f"Python Version: {platform.python_version()}\n"
-                        output += f"Mode: Sandbox Environment\n"
-                        output += "Note: Limited system access in cloud mode"
-                        return {"output": output, "error": "", "success": True}
-                    else:
-                        # Full system info for local environment
-                        import psutil
-                        output = "--- System Information ---\n"
-                        output += f"Platform: {platform.system()} {platform.release()}\n"
-                        output += f"Python Version: {platform.python_version()}\n"
-                        output += f"CPU Usage: {psutil.cpu_percent(interval=1)}%\n"
-                        output += f"Memory Usage: {psutil.virtual_memory().percent}%\n"
-                        output += f"Available Memory: {psutil.virtual_memory().available / (1024**3):.1f} GB"
-                        return {"output": output, "error": "", "success": True}
-                except ImportError:
-                    # Fallback if psutil is not available
-                    output = "--- System Information (Basic) ---\n"
-                    output += f"Platform: {platform.system()}\n"
-                    output += f"Python Version: {platform.python_version()}\n"
-                    output += "Note: Install 'psutil' for detailed system metrics"
-                    return {"output": output, "error": "", "success": True}
-                except Exception as e:
-                    return {"output": "", "error": f"Error: Could not fetch system info: {str(e)}", "success": False}
-            
-            else:
-                return {"output": "", "error": f"Error: Command '{command}' not found. Type 'help' for available commands.", "success": False}
-        
-        except Exception as e:
-            return {"output": "", "error": f"Error: {str(e)}", "success": False}
+# Shared state (directory, mode, history) for running several workers; None keeps state per process
+state_backend = create_state_backend()
 
 def get_user_session():
     """Get or create a user session"""
@@ -287,15 +35,283 @@ def get_user_session():
         session['session_id'] = str(uuid.uuid4())
     
     session_id = session['session_id']
-    if session_id not in user_sessions:
-        user_sessions[session_id] = FileSystemManager()
+    user_fs = user_sessions.get_or_create(session_id, FileSystemManager)
+    if state_backend:
+        load_shared_state(user_fs, session_id)
+    return user_fs
+
+def load_shared_state(user_fs, session_id):
+    """Bring this worker's copy of a session up to date with the shared state backend.
+
+    Only the directory, mode and history are shared; SANDBOX file trees stay in
+    the worker that created them, which is why serve.py runs sandboxes in one worker.
+    """
+    state = state_backend.load(session_id)
+    if state is None:
+        return
+    # Sandbox trees are per worker, so only move to directories that exist here
+    if state["mode"] == user_fs.mode and user_fs.storage.isdir(state["current_dir"]):
+        user_fs.current_dir = state["current_dir"]
+    if state["history_len"] > user_fs.history_saved:
+        missing = state_backend.history_since(session_id, user_fs.history_saved)
+        user_fs.history.extend(missing)
+        user_fs.history_saved += len(missing)
+
+def save_user_session(user_fs):
+    """Write the session's directory, mode and new history entries to the shared state backend"""
+    if not state_backend:
+        return
+    new_history = user_fs.history[user_fs.history_saved:]
+    state_backend.save(session['session_id'], user_fs.current_dir, user_fs.mode, new_history)
+    user_fs.history_saved += len(new_history)
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        "sessions": user_sessions.stats(),
+        "interpreter_cache": interpret_cache.stats(),
+        "listing_cache": listing_cache.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "scheduler": scheduler.stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage latency histograms and command counters in the Prometheus text format"""
+    sessions = user_sessions.stats()
+    cache = interpret_cache.stats()
+    limiter = rate_limiter.stats()
+    fair = scheduler.stats()
+    lines = [
+        "# TYPE pyterm_sessions gauge",
+        f"pyterm_sessions {sessions['active']}",
+        "# TYPE pyterm_sessions_evicted_total counter",
+        f"pyterm_sessions_evicted_total {sessions['evicted_total']}",
+        "# TYPE pyterm_interpret_cache_hits_total counter",
+        f"pyterm_interpret_cache_hits_total {cache['hits']}",
+        "# TYPE pyterm_interpret_cache_misses_total counter",
+        f"pyterm_interpret_cache_misses_total {cache['misses']}",
+        "# TYPE pyterm_rate_limited_total counter",
+        f"pyterm_rate_limited_total {limiter['rejected']}",
+        "# TYPE pyterm_scheduler_running gauge",
+        f"pyterm_scheduler_running {fair['running']}",
+        "# TYPE pyterm_scheduler_waiting gauge",
+        f"pyterm_scheduler_waiting {fair['waiting']}",
+        "# TYPE pyterm_scheduler_timeouts_total counter",
+        f"pyterm_scheduler_timeouts_total {fair['timeouts']}",
+    ]
+    return Response(metrics.render_prometheus() + "\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
+
+# Admin routes are disabled unless a token is configured; requests must send it in X-Admin-Token
+ADMIN_TOKEN = os.environ.get('PYTERM_ADMIN_TOKEN', '')
+MAX_PROFILE_SECONDS = 300
+
+def is_admin():
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """POST ?seconds=N starts the sampling profiler in this process; GET reports its status"""
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    if request.method == 'GET':
+        return jsonify(profiler.status())
     
-    return user_sessions[session_id]
+    seconds = request.args.get('seconds', 10, type=float)
+    if not seconds or not 0 < seconds <= MAX_PROFILE_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {MAX_PROFILE_SECONDS}"}), 400
+    try:
+        profiler.start(seconds)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(profiler.status()), 202
 
 @app.route('/')
 def index():
     return render_template('terminal.html')
 
+EXIT_MESSAGE = "Thanks for using PyTerm! Refresh to start a new session."
+MAX_BATCH_COMMANDS = int(os.environ.get('PYTERM_MAX_BATCH_COMMANDS', 100))
+
+# Bounded pool running disk-bound commands, so a slow disk ties up at most this many threads
+# (threads start on first use); cheap commands run on the request thread
+BLOCKING_WORKERS = int(os.environ.get('PYTERM_BLOCKING_WORKERS', 8))
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="pyterm-io")
+
+def interpret(command_str):
+    """Resolve natural language to a command; returns (command, interpretation or None)"""
+    interpreted = cached_interpret_command(command_str)
+    final_command = interpreted if interpreted else command_str
+    if interpreted and interpreted != command_str:
+        return final_command, f"Interpreted as: {interpreted}"
+    return final_command, None
+
+def interpret_input(user_fs, user_input):
+    """Expand history recall and interpret each command of an input line, once per request.
+
+    Returns (line, steps): line is the input after recall (None if the recalled entry
+    doesn't exist) and steps holds (operator, command, interpretation, interpret seconds)
+    for each chained command, so cost, pool choice and execution share one interpretation.
+    """
+    # '!n', '!-n' and '!!' re-run an earlier command
+    line = expand_recall(user_fs.history, user_input)
+    if line is None or line.lower() == 'exit':
+        return line, []
+    steps = []
+    for segment, operator in split_chain(line):
+        started = time.perf_counter()
+        final_command, interpretation = interpret(segment)
+        steps.append((operator, final_command, interpretation, time.perf_counter() - started))
+    return line, steps
+
+def run_user_input(user_fs, user_input, interpreted=None):
+    """Run one line of user input against a session and return the combined result.
+
+    interpreted is the line's interpret_input() result, if the caller already has it.
+    """
+    line, steps = interpreted or interpret_input(user_fs, user_input)
+    if line is None:
+        return {
+            "output": "",
+            "error": f"Error: {user_input}: event not found",
+            "success": False,
+            "prompt": user_fs.get_relative_path(),
+            "mode": user_fs.get_mode_info()
+        }
+    
+    # Add to history
+    user_fs.history.append(line)
+    
+    # Handle special commands
+    if line.lower() == 'exit':
+        return {
+            "output": EXIT_MESSAGE,
+            "error": "",
+            "success": True,
+            "prompt": user_fs.get_relative_path(),
+            "mode": user_fs.get_mode_info()
+        }
+    
+    # Commands may be chained with ';' (always run) and '&&' (run only after a success)
+    results = []
+    for operator, final_command, interpretation, interpret_seconds in steps:
+        if operator == "&&" and results and not results[-1]["success"]:
+            continue
+        result = user_fs.execute_command(final_command)
+        metrics.observe("interpret", user_fs.last_command, user_fs.mode, interpret_seconds)
+        if interpretation:
+            result["interpretation"] = interpretation
+        results.append(result)
+    
+    if len(results) == 1:
+        result = results[0]
+    else:
+        # Chained commands: concatenate output, status is that of the last command run
+        result = {
+            "output": "\n".join(r["output"] for r in results if r["output"]),
+            "error": "\n".join(r["error"] for r in results if r["error"]),
+            "success": results[-1]["success"] if results else True
+        }
+        interpretations = [r["interpretation"] for r in results if r.get("interpretation")]
+        if interpretations:
+            result["interpretation"] = "\n".join(interpretations)
+    
+    if line != user_input:
+        result["interpretation"] = "\n".join(filter(None, [f"Recalled: {line}", result.get("interpretation")]))
+    result["prompt"] = user_fs.get_relative_path()
+    result["mode"] = user_fs.get_mode_info()
+    return result
+
+def record_stages(user_fs, session_seconds, serialize_seconds):
+    """Record the per-request stages, labelled with the last command the request ran"""
+    metrics.observe("session", user_fs.last_command, user_fs.mode, session_seconds)
+    metrics.observe("serialize", user_fs.last_command, user_fs.mode, serialize_seconds)
+
+def needs_blocking_pool(user_fs, interpreted):
+    """True if any command of an interpreted input line does blocking disk I/O in this session"""
+    return any(is_blocking(user_fs, command) for _, command, _, _ in interpreted[1])
+
+def request_cost(interpreted):
+    """Cost of an interpreted input line: the sum of the costs of its commands"""
+    return sum(command_cost(command) for _, command, _, _ in interpreted[1]) or 1
+
+def respond(result, status=200):
+    """Result as JSON, or in the compact binary format if the client accepts it"""
+    if compact.COMPACT_MIMETYPE in request.headers.get('Accept', ''):
+        body = compact.encode(result, request.headers.get('X-PyTerm-Mode'))
+        response = Response(body, status=status, mimetype=compact.COMPACT_MIMETYPE)
+    else:
+        response = jsonify(result)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
+
+def refused(user_fs, error, status, retry_after=None):
+    """Response for a request that was not run: over the rate limit (429) or no free slot (503)"""
+    result = {
+        "output": "",
+        "error": error,
+        "success": False,
+        "prompt": user_fs.get_relative_path(),
+        "mode": user_fs.get_mode_info()
+    }
+    if retry_after is None:
+        return respond(result, status)
+    seconds = max(1, math.ceil(retry_after))
+    result["retry_after"] = seconds
+    response = respond(result, status)
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+def rate_limit_error(cost, retry_after):
+    """Error message for a request the rate limiter did not admit"""
+    if retry_after is None:
+        return (f"Error: Request too expensive (cost {cost:g}, at most {rate_limiter.burst:g} at once); "
+                f"split it into smaller requests")
+    return f"Error: Too many commands, try again in {math.ceil(retry_after)}s"
+
+def rate_limited(user_fs, cost):
+    """429 response if the session has used up its rate limit, else None"""
+    retry_after = rate_limiter.take(session['session_id'], cost)
+    if retry_after == 0:
+        return None
+    return refused(user_fs, rate_limit_error(cost, retry_after), 429, retry_after)
+
+def run_scheduled(user_fs, session_id, user_input, interpreted, cost):
+    """run_user_input once the fair scheduler gives the session a slot, on the I/O pool if it does disk I/O"""
+    with scheduler.slot(session_id, cost):
+        if needs_blocking_pool(user_fs, interpreted):
+            return blocking_executor.submit(run_user_input, user_fs, user_input, interpreted).result()
+        return run_user_input(user_fs, user_input, interpreted)
+
+def scheduled_chunks(session_id, chunks, cost, blocking=False):
+    """Chunks of a streamed command, each produced while holding a scheduler slot.
+
+    The slot is released while a chunk is sent, so a slow reader doesn't hold one;
+    the command's cost is charged with its first chunk. Chunks of a blocking
+    command are produced on the I/O pool.
+    """
+    chunks = iter(chunks)
+    while True:
+        with scheduler.slot(session_id, cost):
+            if blocking:
+                chunk = blocking_executor.submit(next, chunks, None).result()
+            else:
+                chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+        cost = 0
+
+def server_error(e):
+    return {
+        "output": "",
+        "error": f"Server error: {str(e)}",
+        "success": False,
+        "prompt": "~",
+        "mode": {"mode": "ERROR", "description": "System error"}
+    }
+
 @app.route('/execute', methods=['POST'])
 def execute_command():
     try:
@@ -303,52 +319,180 @@ def execute_command():
         user_input = data.get('command', '').strip()
         
         if not user_input:
-            return jsonify({"output": "", "error": "", "success": True, "prompt": ""})
+            return respond({"output": "", "error": "", "success": True, "prompt": ""})
         
         # Get user session
+        started = time.perf_counter()
         user_fs = get_user_session()
+        session_seconds = time.perf_counter() - started
         
-        # Add to history
-        user_fs.history.append(user_input)
+        interpreted = interpret_input(user_fs, user_input)
+        cost = request_cost(interpreted)
+        limited = rate_limited(user_fs, cost)
+        if limited:
+            return limited
+        try:
+            result = run_scheduled(user_fs, session['session_id'], user_input, interpreted, cost)
+        except SchedulerBusy as e:
+            return refused(user_fs, f"Error: {e}", 503, 1)
         
-        # Handle special commands
-        if user_input.lower() == 'exit':
-            return jsonify({
-                "output": "Thanks for using PyTerm! Refresh to start a new session.",
-                "error": "",
-                "success": True,
-                "prompt": user_fs.get_relative_path(),
-                "mode": user_fs.get_mode_info()
-            })
+        started = time.perf_counter()
+        save_user_session(user_fs)
+        saved = time.perf_counter()
+        response = respond(result)
+        record_stages(user_fs, session_seconds + saved - started, time.perf_counter() - saved)
+        return response
+    
+    except Exception as e:
+        return respond(server_error(e))
+
+@app.route('/execute/batch', methods=['POST'])
+def execute_batch():
+    """Run several command lines in order against the same session in one round-trip"""
+    try:
+        data = request.get_json()
+        commands = data.get('commands', [])
+        stop_on_error = bool(data.get('stop_on_error', False))
         
-        # Try to interpret the command using natural language
-        interpreted = interpret_command(user_input)
-        final_command = interpreted if interpreted else user_input
+        if not isinstance(commands, list) or not all(isinstance(c, str) for c in commands):
+            return jsonify({"error": "'commands' must be a list of strings", "success": False}), 400
+        if len(commands) > MAX_BATCH_COMMANDS:
+            return jsonify({"error": f"At most {MAX_BATCH_COMMANDS} commands per batch", "success": False}), 400
         
-        # Execute the command
-        result = user_fs.execute_command(final_command)
-        result["prompt"] = user_fs.get_relative_path()
-        result["mode"] = user_fs.get_mode_info()
+        user_fs = get_user_session()
         
-        # Show interpretation if it was used
-        if interpreted and interpreted != user_input:
-            result["interpretation"] = f"Interpreted as: {interpreted}"
+        results = []
+        for command in commands:
+            user_input = command.strip()
+            if not user_input:
+                results.append({"output": "", "error": "", "success": True})
+                continue
+            # Each command is rate limited and waits for its own slot, so a long batch pays for
+            # every command and doesn't hold a slot throughout
+            interpreted = interpret_input(user_fs, user_input)
+            cost = request_cost(interpreted)
+            retry_after = rate_limiter.take(session['session_id'], cost)
+            if retry_after != 0:
+                result = {"output": "", "error": rate_limit_error(cost, retry_after), "success": False}
+                if retry_after is not None:
+                    result["retry_after"] = max(1, math.ceil(retry_after))
+                results.append(result)
+                # The rest of the batch is not run either
+                break
+            try:
+                result = run_scheduled(user_fs, session['session_id'], user_input, interpreted, cost)
+            except SchedulerBusy as e:
+                result = {"output": "", "error": f"Error: {e}", "success": False}
+            # Prompt and mode are reported once for the whole batch
+            result.pop("prompt", None)
+            result.pop("mode", None)
+            results.append(result)
+            if stop_on_error and not result["success"]:
+                break
         
-        return jsonify(result)
-    
-    except Exception as e:
+        save_user_session(user_fs)
         return jsonify({
-            "output": "",
-            "error": f"Server error: {str(e)}",
-            "success": False,
-            "prompt": "~",
-            "mode": {"mode": "ERROR", "description": "System error"}
+            "results": results,
+            "success": all(r["success"] for r in results),
+            "prompt": user_fs.get_relative_path(),
+            "mode": user_fs.get_mode_info()
         })
+    
+    except Exception as e:
+        return jsonify(server_error(e))
+
+def sse_event(event, payload):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/complete', methods=['POST'])
+def complete_command():
+    """Tab completions for the last word of the command line typed so far"""
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(complete(get_user_session(), data.get('line', '')))
+    except Exception as e:
+        return jsonify({"word": "", "completions": [], "truncated": False, "error": str(e)})
+
+@app.route('/execute/stream', methods=['POST'])
+def execute_command_stream():
+    """Streaming variant of /execute: output chunks are sent as server-sent events as they are produced"""
+    data = request.get_json(silent=True) or {}
+    user_input = data.get('command', '').strip()
+    user_fs = get_user_session()
+    session_id = session['session_id']
+    command_line, steps = interpreted = interpret_input(user_fs, user_input) if user_input else (user_input, [])
+    if command_line:
+        limited = rate_limited(user_fs, request_cost(interpreted))
+        if limited:
+            return limited
+        user_fs.history.append(command_line)
+    
+    def events():
+        try:
+            if not user_input:
+                yield sse_event("done", {"success": True, "prompt": ""})
+                return
+            
+            if command_line is None:
+                yield sse_event("chunk", {"output": "", "error": f"Error: {user_input}: event not found", "success": False})
+                yield sse_event("done", {"success": False, "prompt": user_fs.get_relative_path(), "mode": user_fs.get_mode_info()})
+                return
+            if command_line != user_input:
+                yield sse_event("interpretation", {"interpretation": f"Recalled: {command_line}"})
+            
+            if command_line.lower() == 'exit':
+                yield sse_event("chunk", {"output": EXIT_MESSAGE, "error": "", "success": True})
+                save_user_session(user_fs)
+                yield sse_event("done", {"success": True, "prompt": user_fs.get_relative_path(), "mode": user_fs.get_mode_info()})
+                return
+            
+            success = True
+            more = None
+            for operator, final_command, interpretation, interpret_seconds in steps:
+                if operator == "&&" and not success:
+                    continue
+                if interpretation:
+                    yield sse_event("interpretation", {"interpretation": interpretation})
+                
+                success = True
+                more = None
+                chunks = user_fs.execute_command_stream(final_command)
+                try:
+                    for chunk in scheduled_chunks(session_id, chunks, command_cost(final_command),
+                                                  is_blocking(user_fs, final_command)):
+                        success = success and chunk["success"]
+                        # A paged listing ends with the command for its next page; the client offers it when done
+                        more = chunk.pop("more", None) or more
+                        yield sse_event("chunk", chunk)
+                except SchedulerBusy as e:
+                    success = False
+                    yield sse_event("chunk", {"output": "", "error": f"Error: {e}", "success": False})
+                    break
+                finally:
+                    chunks.close()
+                metrics.observe("interpret", user_fs.last_command, user_fs.mode, interpret_seconds)
+            
+            save_user_session(user_fs)
+            done = {"success": success, "prompt": user_fs.get_relative_path(), "mode": user_fs.get_mode_info()}
+            if more:
+                done["more"] = more
+            yield sse_event("done", done)
+        
+        except Exception as e:
+            yield sse_event("chunk", {"output": "", "error": f"Server error: {str(e)}", "success": False})
+            yield sse_event("done", {"success": False, "prompt": "~", "mode": {"mode": "ERROR", "description": "System error"}})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 if __name__ == '__main__':
-    import os
-    port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
+    # PYTERM_SERVER selects the development server (default), waitress or gunicorn
+    from serve import run
+    run(app)
 
 # For Vercel deployment
 app = app
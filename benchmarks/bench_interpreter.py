@@ -0,0 +1,59 @@
+"""Compare main.interpret_command against the original if-chain interpreter.
+
+Usage: python benchmarks/bench_interpreter.py [corpus_size] [repeat]
+
+Fails if the two interpreters disagree on any query of the golden corpus.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import interpret_command, cached_interpret_command, interpret_cache
+from corpus import build_corpus
+from legacy_interpreter import legacy_interpret_command
+
+
+def check_golden(corpus):
+    """Return the queries where the interpreters disagree"""
+    return [q for q in corpus if interpret_command(q) != legacy_interpret_command(q)]
+
+
+def time_interpreter(func, corpus, repeat):
+    def run():
+        for query in corpus:
+            func(query)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(corpus) * 1e6  # microseconds per query
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    corpus = build_corpus(size)
+
+    mismatches = check_golden(corpus)
+    if mismatches:
+        for query in mismatches[:20]:
+            print(f"MISMATCH {query!r}: {interpret_command(query)!r} != {legacy_interpret_command(query)!r}")
+        sys.exit(1)
+    print(f"golden corpus: {len(corpus)} queries, all identical")
+
+    legacy = time_interpreter(legacy_interpret_command, corpus, repeat)
+    current = time_interpreter(interpret_command, corpus, repeat)
+    print(f"legacy interpret_command:  {legacy:.2f} us/query")
+    print(f"current interpret_command: {current:.2f} us/query")
+    print(f"speedup: {legacy / current:.2f}x")
+
+    # Real traffic is dominated by a few repeated phrases
+    repeated = [corpus[i % 50] for i in range(len(corpus))]
+    interpret_cache.clear()
+    cached = time_interpreter(cached_interpret_command, repeated, repeat)
+    uncached = time_interpreter(interpret_command, repeated, repeat)
+    print(f"repeated phrases, uncached: {uncached:.2f} us/query")
+    print(f"repeated phrases, cached:   {cached:.2f} us/query ({interpret_cache.stats()['hit_rate']:.2%} hit rate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Per-request overhead of the shared session state backend.
+
+Usage: python benchmarks/bench_session_state.py [requests]
+
+Runs the same /execute requests through Flask's test client with the
+per-process state (PYTERM_SESSION_BACKEND=memory) and with SQLite, each in a
+fresh interpreter, and reports the difference per request.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import app
+requests = int(sys.argv[2])
+client = app.app.test_client()
+commands = ["pwd", "cd documents", "ls", "cd ..", "history"]
+client.post('/execute', json={"command": "pwd"})
+start = time.perf_counter()
+refused = 0
+for i in range(requests):
+    refused += client.post('/execute', json={"command": commands[i % len(commands)]}).status_code != 200
+elapsed = time.perf_counter() - start
+if refused:
+    sys.exit(f"{refused} of {requests} requests were refused")
+print(json.dumps({"us_per_request": elapsed / requests * 1e6}))
+"""
+
+
+def run(backend, requests, db_path):
+    # Rate limiting off, so every timed request runs and saves its state instead of getting 429
+    env = dict(os.environ, PYTERM_SESSION_BACKEND=backend, PYTERM_SESSION_DB=db_path, PYTERM_RATE_LIMIT="0")
+    out = subprocess.run([sys.executable, "-c", WORKER, ROOT, str(requests)],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])["us_per_request"]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.db")
+        memory = run("memory", requests, db_path)
+        sqlite = run("sqlite", requests, db_path)
+    print(f"memory backend: {memory:.1f} us/request")
+    print(f"sqlite backend: {sqlite:.1f} us/request")
+    print(f"overhead:       {sqlite - memory:.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare two benchmark suite result files.
+
+Usage: python benchmarks/compare.py BASE.json NEW.json [threshold_percent]
+
+Prints every measurement with its change and exits non-zero if any got worse
+by more than the threshold (default 10%).
+"""
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    base, new = load(sys.argv[1]), load(sys.argv[2])
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    print(f"base {base['commit']} ({base['timestamp']})  vs  new {new['commit']} ({new['timestamp']})")
+    if base.get("quick") != new.get("quick") or base.get("cpu_count") != new.get("cpu_count"):
+        print("warning: results come from different settings or machines")
+
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old, cur = base["results"].get(name), new["results"].get(name)
+        if old is None or cur is None:
+            print(f"{name:<42} {'only in ' + ('new' if old is None else 'base'):>30}")
+            continue
+        if old["value"]:
+            change = (cur["value"] - old["value"]) / old["value"] * 100
+        else:
+            change = 0.0 if not cur["value"] else float("inf")
+        worse = change if old["better"] == "lower" else -change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"{name:<42} {old['value']:>12.2f} -> {cur['value']:>12.2f} {cur['unit']:<9} {change:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
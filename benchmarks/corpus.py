@@ -0,0 +1,42 @@
+import random
+
+# Phrases users actually type (help text, README and common variations)
+SEED_PHRASES = [
+    "show me what's in this directory", "list files", "ls", "what's in here", "whats in there?",
+    "see files", "where am I", "where am I right now?", "pwd", "show me the current path",
+    "current directory", "create a folder called test", "make a directory named \"My Files\"",
+    "create test", "make build", "delete the temp folder", "remove 'old stuff'", "rm logs",
+    "go to the documents folder", "go back", "go up", "cd ..", "move back", "step back",
+    "up one level", "parent directory", "navigate into src", "enter projects", "change to Downloads",
+    "cd Desktop", "go Documents", "show system info", "computer info", "sysinfo", "cpu usage",
+    "memory usage please", "hardware info", "system stats", "performance info", "pc info",
+    "help", "history", "clear", "mode", "exit", "", "   ", "what is this", "tools", "backup the files",
+    "update the list", "support", "list the folder called reports", "delete", "go", "make",
+    "remove the file named notes.txt", "go into the 'Project Files' directory", "where",
+    "create a folder", "cd", "upwd", "show me sysinfo", "what's the cpu usage right now?",
+    # Literal commands with flags or pipes, and natural language that merely contains them
+    "ls -la", "ls -l docs", "ls --cursor=abc", "rm -rf foo", "history | grep cd", "find . -name x",
+    "delete the folder -old", "go to -docs", "show me files | more", "list - files",
+]
+
+VERBS = ["show me", "list", "create", "make", "delete", "remove", "go", "go to", "navigate",
+         "enter", "change", "cd", "rm", "where am i", "go back", "go up", "see", "open"]
+FILLERS = ["the", "a", "an", "called", "named", "into", "to", "folder", "directory", "file",
+           "this", "here", "there?", "now", "please", "what's in", "system info", "up", "back"]
+NAMES = ["docs", "Documents", "src", "test", "My Folder", "tmp", "build", "Photos", "a.txt",
+         "'quoted name'", "\"Other Dir\"", "logs", "backup", "ls", "pwd", "update"]
+
+
+def build_corpus(size=10000, seed=1234):
+    """Build a deterministic corpus of natural language queries"""
+    rng = random.Random(seed)
+    corpus = list(SEED_PHRASES)
+    while len(corpus) < size:
+        parts = [rng.choice(VERBS)]
+        for _ in range(rng.randint(0, 4)):
+            parts.append(rng.choice(FILLERS if rng.random() < 0.6 else NAMES))
+        query = " ".join(parts)
+        if rng.random() < 0.3:
+            query = query.upper() if rng.random() < 0.5 else query.title()
+        corpus.append(query)
+    return corpus[:size]
@@ -0,0 +1,103 @@
+import re
+
+from commands import COMMANDS
+
+
+def legacy_interpret_command(query):
+    """Reference copy of the original if-chain interpreter, kept for golden comparisons.
+
+    Deliberate changes since: a registered command followed by option flags
+    or a pipe is left uninterpreted ("ls -la", "history | grep cd"), and cd
+    takes the name before a trailing "folder"/"directory" ("go to the
+    reports folder" -> cd reports).
+    """
+    raw_query = query.strip()
+    query = raw_query.lower()
+    words = query.split()
+
+    if words and words[0] in COMMANDS and any(w.startswith("-") or w == "|" for w in words[1:]):
+        return ""
+
+    # --- Helper: extract quoted or named target ---
+    target = ""
+    match = re.search(r'["\']([^"\']+)["\']', raw_query)  # preserve case inside quotes
+    if match:
+        target = match.group(1)
+    else:
+        skip_words = {"the", "a", "an", "called", "named"}
+        for i, w in enumerate(words):
+            if w in ["folder", "directory", "file", "into", "to"]:
+                if i + 1 < len(words):
+                    nxt = raw_query.split()[i + 1]  # preserve case
+                    if nxt.lower() not in skip_words:
+                        target = nxt
+                        break
+        marked = target
+        if not target and len(words) > 1:
+            last = raw_query.split()[-1]
+            if last.lower() not in skip_words:
+                target = last
+
+    # clean target
+    target = target.strip("\"'")
+
+    # wrap multi-word names in quotes
+    if " " in target:
+        target = f"\"{target}\""
+
+    # --- ls command ---
+    if any(phrase in query for phrase in ["show me", "list", "what's in", "whats in", "see files", "ls", "there?"]):
+        if not any(w in words for w in ["create", "make", "delete", "remove", "go", "cd", "where"]):
+            return "ls"
+
+    # --- pwd command ---
+    if any(phrase in query for phrase in [
+        "where am i", "current directory", "pwd", "current path",
+        "where am i right now", "show me the current path"
+    ]):
+        return "pwd"
+
+    # --- mkdir command ---
+    if any(w in words for w in ["create", "make"]):
+        if "folder" in words or "directory" in words:
+            return f'mkdir {target}'
+        if len(words) > 1 and words[0] in ["create", "make"]:
+            return f'mkdir {target}'
+
+    # --- rm command ---
+    if any(w in words for w in ["delete", "remove", "rm"]):
+        if target:
+            return f'rm {target}'
+
+    # --- cd .. command (go back/up) ---
+    if any(phrase in query for phrase in [
+        "go back", "go up", "back", "up one", "parent directory", 
+        "previous directory", "up", "cd ..", "move back", "step back"
+    ]):
+        return "cd .."
+
+    # --- cd command ---
+    if any(w in words for w in ["go", "navigate", "cd", "enter", "change"]):
+        not_names = [
+            "the", "a", "an", "called", "named", "folder", "directory", "file", "into", "to",
+            "create", "make", "delete", "remove", "rm", "go", "navigate", "cd", "enter", "change",
+            "my", "your", "our", "their", "his", "her", "its", "this", "that", "these", "those",
+            "some", "new", "here", "there"
+        ]
+        if not match and not marked and len(words) > 1 and words[-1] in ["folder", "directory"]:
+            if words[-2] not in not_names:
+                target = raw_query.split()[-2].strip("\"'")
+        if "directory" in words or "folder" in words or "into" in words or "to" in words:
+            return f'cd {target}'
+        if len(words) > 1 and words[0] in ["go", "cd", "enter"]:
+            return f'cd {target}'
+
+    # --- sysinfo command ---
+    if any(phrase in query for phrase in [
+        "system info", "system information", "sysinfo", "sys info",
+        "show system info", "computer info", "pc info", "hardware info",
+        "cpu usage", "memory usage", "system stats", "performance info"
+    ]):
+        return "sysinfo"
+
+    return ""  # no match
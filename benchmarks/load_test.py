@@ -0,0 +1,123 @@
+"""HTTP load test of the serving modes in serve.py.
+
+Usage: python benchmarks/load_test.py [seconds] [clients] [modes...]
+
+Starts the app once per mode (dev, waitress, gunicorn) in a subprocess, then
+runs concurrent clients against /execute for the given number of seconds.
+Every client keeps its own keep-alive connection and session cookie, like a
+browser tab. Reports requests per second and p50/p99 latency per mode.
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = ["pwd", "ls", "cd documents", "ls", "cd ..", "history"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, db_path):
+    # Rate limiting is off: every client sends as fast as it can on purpose
+    env = dict(os.environ, PORT=str(port), PYTERM_SERVER=mode,
+               PYTERM_SESSION_BACKEND="sqlite", PYTERM_SESSION_DB=db_path, PYTERM_RATE_LIMIT="0")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "app.py")], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def client(port, stop, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    cookie = None
+    i = 0
+    while not stop.is_set():
+        body = '{"command": "%s"}' % COMMANDS[i % len(COMMANDS)]
+        headers = {"Content-Type": "application/json"}
+        if cookie:
+            headers["Cookie"] = cookie
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/execute", body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            set_cookie = response.getheader("Set-Cookie")
+            if set_cookie:
+                cookie = set_cookie.split(";", 1)[0]
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    conn.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def run_mode(mode, seconds, clients, db_path):
+    port = free_port()
+    proc = start_server(mode, port, db_path)
+    try:
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(port, stop, latencies, errors)) for _ in range(clients)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    modes = sys.argv[3:] or ["dev", "waitress", "gunicorn"]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            results[mode] = run_mode(mode, seconds, clients, os.path.join(tmp, f"{mode}.db"))
+
+    baseline = results.get("dev")
+    print(f"{clients} clients, {seconds:g}s per mode")
+    print(f"{'mode':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'vs dev':>7}")
+    for mode, r in results.items():
+        ratio = f"{r['rps'] / baseline['rps']:.2f}x" if baseline and baseline["rps"] else "-"
+        print(f"{mode:<10} {r['rps']:>9.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['errors']:>7} {ratio:>7}")
+
+
+if __name__ == "__main__":
+    main()
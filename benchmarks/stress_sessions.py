@@ -0,0 +1,72 @@
+"""Concurrency stress check: many REAL OS sessions changing directories in parallel threads.
+
+Usage: python benchmarks/stress_sessions.py [sessions] [iterations]
+
+Each session owns a private directory tree and repeatedly runs cd/pwd/mkdir/ls/rm.
+Exits non-zero if any session ever observes another session's working directory,
+which is what happened while cd/pwd relied on the process-wide os.chdir/os.getcwd.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import FileSystemManager
+
+
+def run_session(root, index, iterations, errors):
+    home = os.path.join(root, f"session{index}")
+    os.makedirs(os.path.join(home, "a", "b"))
+    fs = FileSystemManager(serverless=False, base_dir=home)
+    expected_a = os.path.join(home, "a")
+    expected_b = os.path.join(expected_a, "b")
+    for i in range(iterations):
+        steps = [
+            ("cd a", None), ("pwd", expected_a),
+            ("cd b", None), ("pwd", expected_b),
+            (f"mkdir tmp{i}", None), ("rm tmp%d" % i, None),
+            ("cd ..", None), ("pwd", expected_a),
+            ("cd ..", None), ("pwd", home),
+        ]
+        for command, expected in steps:
+            result = fs.execute_command(command)
+            if not result["success"]:
+                errors.append(f"session {index}: {command!r} failed: {result['error']}")
+                return
+            if expected is not None and result["output"] != expected:
+                errors.append(f"session {index}: {command!r} returned {result['output']!r}, expected {expected!r}")
+                return
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    root = tempfile.mkdtemp(prefix="pyterm-stress-")
+    errors = []
+    try:
+        threads = [threading.Thread(target=run_session, args=(root, i, iterations, errors)) for i in range(sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    commands = sessions * iterations * 10
+    print(f"{sessions} sessions x {iterations} iterations: {commands} commands in {elapsed:.2f}s "
+          f"({commands / elapsed:.0f} commands/s)")
+    if errors:
+        for error in errors[:20]:
+            print("FAIL", error)
+        sys.exit(1)
+    print("no cross-session interference")
+
+
+if __name__ == "__main__":
+    main()
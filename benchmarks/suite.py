@@ -0,0 +1,307 @@
+"""Reproducible benchmark suite: interpreter, command handlers and the HTTP path.
+
+Usage: python benchmarks/suite.py [--quick] [--only interpreter,handlers,http,payload]
+                                  [--sizes 10,10000,1000000] [--disk-max 10000]
+                                  [--output FILE]
+
+- interpreter: main.interpret_command over the generated phrase corpus, uncached
+  and through the LRU cache with repeated phrases
+- handlers: ls, cd, mkdir and rm through FileSystemManager on a directory of
+  10, 10k and 1M entries, on the in-memory sandbox storage and on disk (disk
+  trees above --disk-max entries are skipped, building them takes minutes)
+- http: /execute through Flask's test client with many concurrent sessions
+- payload: /execute response size and serialization time, JSON vs the compact
+  binary format (steady state, where the client already has the mode)
+
+Results are written as JSON (default benchmarks/results/<commit>.json) and can
+be compared across commits with benchmarks/compare.py.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import build_corpus
+
+
+class Results:
+    """Named measurements; better is 'lower' or 'higher'"""
+
+    def __init__(self):
+        self.values = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.values[name] = {"value": round(value, 3), "unit": unit, "better": better}
+        print(f"  {name:<42} {value:>12.2f} {unit}")
+
+
+def measure(func, min_time=0.3, min_runs=3, max_runs=1000):
+    """Median seconds per call; func() returns the seconds it wants counted, or None for all of it"""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or (time.perf_counter() - started < min_time and len(timings) < max_runs):
+        start = time.perf_counter()
+        counted = func()
+        timings.append(counted if counted is not None else time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+# --- interpreter -------------------------------------------------------------
+
+def bench_interpreter(results, quick):
+    from main import interpret_command, cached_interpret_command, interpret_cache
+
+    corpus = build_corpus(2000 if quick else 20000)
+
+    def run_uncached():
+        for query in corpus:
+            interpret_command(query)
+
+    results.add("interpreter.uncached", measure(run_uncached, min_time=1.0) / len(corpus) * 1e6, "us/query")
+
+    # Real traffic is dominated by a few repeated phrases
+    repeated = [corpus[i % 50] for i in range(len(corpus))]
+    interpret_cache.clear()
+
+    def run_cached():
+        for query in repeated:
+            cached_interpret_command(query)
+
+    results.add("interpreter.cached", measure(run_cached, min_time=1.0) / len(repeated) * 1e6, "us/query")
+
+
+# --- handlers ----------------------------------------------------------------
+
+def memory_session(size):
+    """Sandbox session whose base tree holds big/ with size files"""
+    from filesystem import FileSystemManager
+    from storage import MemoryStorage, Node
+
+    base = Node()
+    big = base.children["big"] = Node()
+    for i in range(size):
+        big.children[f"f{i:07d}.txt"] = Node(is_dir=False, size=i % 4096)
+    fs = FileSystemManager(serverless=True)
+    fs.storage = MemoryStorage(base=base, quota=1 << 40)
+    fs.base_dir = fs.current_dir = fs.storage.root
+    return fs
+
+
+def disk_session(size, tmp):
+    """REAL OS session rooted in tmp with big/ holding size files"""
+    from filesystem import FileSystemManager
+
+    big = os.path.join(tmp, "big")
+    os.makedirs(big)
+    for i in range(size):
+        with open(os.path.join(big, f"f{i:07d}.txt"), "w"):
+            pass
+    return FileSystemManager(serverless=False, base_dir=tmp)
+
+
+def run_handlers(results, fs, label, size):
+    big = os.path.join(fs.base_dir, "big")
+
+    def execute(command, cwd):
+        fs.current_dir = cwd
+        result = fs.execute_command(command)
+        if not result["success"]:
+            raise RuntimeError(f"{command!r} failed: {result['error']}")
+
+    results.add(f"handlers.{label}.{size}.ls", measure(lambda: execute("ls", big)) * 1e6, "us/op")
+    results.add(f"handlers.{label}.{size}.ls_long_by_size", measure(lambda: execute("ls -l -S", big)) * 1e6, "us/op")
+    results.add(f"handlers.{label}.{size}.cd", measure(lambda: execute("cd big", fs.base_dir)) * 1e6, "us/op")
+
+    counter = [0]
+    rm_timings = []
+
+    def mkdir_then_rm():
+        counter[0] += 1
+        name = f"new{counter[0]}"
+        start = time.perf_counter()
+        execute(f"mkdir {name}", big)
+        made = time.perf_counter()
+        execute(f"rm {name}", big)
+        rm_timings.append(time.perf_counter() - made)
+        return made - start
+
+    results.add(f"handlers.{label}.{size}.mkdir", measure(mkdir_then_rm) * 1e6, "us/op")
+    results.add(f"handlers.{label}.{size}.rm", statistics.median(rm_timings) * 1e6, "us/op")
+
+    # Removing the whole tree; large disk trees go to a background job, wait for it
+    start = time.perf_counter()
+    execute("rm big", fs.base_dir)
+    for job in fs.jobs.list():
+        while job.status == "running":
+            time.sleep(0.01)
+    results.add(f"handlers.{label}.{size}.rm_tree", (time.perf_counter() - start) * 1e3, "ms")
+
+
+def bench_handlers(results, sizes, disk_max):
+    for size in sizes:
+        fs = memory_session(size)
+        run_handlers(results, fs, "memory", size)
+        fs.cleanup()
+
+        if size > disk_max:
+            print(f"  (disk tree of {size} entries skipped, raise --disk-max to include it)")
+            continue
+        tmp = tempfile.mkdtemp(prefix="pyterm-bench-")
+        try:
+            fs = disk_session(size, tmp)
+            run_handlers(results, fs, "disk", size)
+            fs.cleanup()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+# --- http --------------------------------------------------------------------
+
+HTTP_COMMANDS = ["pwd", "ls", "cd documents", "show me what's in here", "cd ..", "history 5", "mkdir tmp && rm tmp"]
+
+
+def bench_http(results, sessions, requests_per_session):
+    import app
+    from admission import rate_limiter
+
+    # Sessions send back to back on purpose; measure serving, not the rate limit
+    rate_limiter.rate = 0
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions + 1)
+
+    def session_client():
+        client = app.app.test_client()  # own cookie jar, so its own session
+        mine = []
+        barrier.wait()
+        for i in range(requests_per_session):
+            start = time.perf_counter()
+            response = client.post('/execute', json={"command": HTTP_COMMANDS[i % len(HTTP_COMMANDS)]})
+            mine.append(time.perf_counter() - start)
+            if response.status_code != 200 or not response.get_json()["success"]:
+                errors.append(response.status_code)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=session_client) for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    results.add("http.throughput", len(latencies) / elapsed, "req/s", better="higher")
+    results.add("http.p50", latencies[len(latencies) // 2] * 1e3, "ms")
+    results.add("http.p99", latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3, "ms")
+    results.add("http.errors", len(errors), "requests")
+
+
+# --- payload -----------------------------------------------------------------
+
+PAYLOAD_COMMANDS = ["pwd", "ls", "ls -l documents", "show me what's in here", "cd nowhere", "history 5", "help"]
+
+
+def bench_payload(results):
+    import app
+    import compact
+    from admission import rate_limiter
+    from filesystem import FileSystemManager
+
+    rate_limiter.rate = 0
+    client = app.app.test_client()
+    accept = {"Accept": compact.COMPACT_MIMETYPE}
+    tag = compact.decode(client.post('/execute', json={"command": "pwd"}, headers=accept).data)["mode_tag"]
+    accept["X-PyTerm-Mode"] = tag
+
+    json_bytes = compact_bytes = 0
+    for command in PAYLOAD_COMMANDS:
+        json_bytes += len(client.post('/execute', json={"command": command}).data)
+        compact_bytes += len(client.post('/execute', json={"command": command}, headers=accept).data)
+    results.add("payload.json_bytes", json_bytes / len(PAYLOAD_COMMANDS), "bytes")
+    results.add("payload.compact_bytes", compact_bytes / len(PAYLOAD_COMMANDS), "bytes")
+    results.add("payload.saved", (1 - compact_bytes / json_bytes) * 100, "%", better="higher")
+
+    # Building the response from a result, as the serialize stage of /execute does
+    fs = FileSystemManager(serverless=True)
+    payloads = [app.run_user_input(fs, command) for command in PAYLOAD_COMMANDS]
+    fs.cleanup()
+    def encode_all():
+        for payload in payloads:
+            app.respond(payload)
+
+    for label, headers in (("json", {}), ("compact", accept)):
+        with app.app.test_request_context('/execute', method='POST', headers=headers):
+            seconds = measure(encode_all, min_time=0.5)
+        results.add(f"payload.{label}_encode", seconds / len(payloads) * 1e6, "us/response")
+
+
+# --- main --------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTerm benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="smaller corpus, sizes and request counts")
+    parser.add_argument("--only", default="interpreter,handlers,http,payload", help="comma-separated parts to run")
+    parser.add_argument("--sizes", default=None, help="directory sizes for the handler benchmarks")
+    parser.add_argument("--disk-max", type=int, default=10000, help="largest directory built on disk")
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent sessions of the HTTP benchmark")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    args = parser.parse_args()
+
+    parts = set(args.only.split(","))
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else ([10, 10000] if args.quick else [10, 10000, 1000000])
+    commit = git_commit()
+    results = Results()
+
+    if "interpreter" in parts:
+        print("interpreter")
+        bench_interpreter(results, args.quick)
+    if "handlers" in parts:
+        print("handlers")
+        bench_handlers(results, sizes, args.disk_max)
+    if "http" in parts:
+        print("http")
+        bench_http(results, args.sessions, 20 if args.quick else 100)
+    if "payload" in parts:
+        print("payload")
+        bench_payload(results)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+            "results": results.values,
+        }, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,884 @@
+"""Command registry shared by the web apps and the CLI.
+
+Every terminal command is a handler registered by name in COMMANDS together
+with its usage, help text, whether its output may be cached, whether it
+does blocking file system I/O and its relative cost for rate limiting and
+scheduling. Handlers take
+the session (a FileSystemManager) and the argument list and return the usual
+{"output", "error", "success"} result dict. Commands with long output can also
+register a streaming handler that yields result dicts chunk by chunk.
+"""
+import base64
+import bisect
+import errno
+import fnmatch
+import heapq
+import itertools
+import json
+import os
+import platform
+import time
+
+import jobs
+from history import HISTORY_SHOW
+from listing_cache import Listing, listing_cache
+from walk import Walk, tree_lines
+from metrics import metrics
+
+
+class Command:
+    """A registered terminal command"""
+
+    def __init__(self, name, handler, usage=None, help="", cacheable=False, blocking=False, cost=1):
+        self.name = name
+        self.handler = handler
+        self.usage = usage or name
+        self.help = help
+        # Output depends only on the command line and the session mode, not on session or disk state
+        self.cacheable = cacheable
+        # Does file system I/O that may block on a slow disk; only applies to on-disk storage.
+        # A function of the session decides for commands that only sometimes touch the disk
+        self.blocking = blocking
+        # Weight charged against the session's rate limit and fair share (1 = a cheap command)
+        self.cost = cost
+        # Optional generator handler used by the streaming endpoint
+        self.stream = None
+
+    def __call__(self, fs, args):
+        return self.handler(fs, args)
+
+
+COMMANDS = {}
+
+
+def command(name, usage=None, help="", cacheable=False, blocking=False, cost=1):
+    """Decorator registering a handler under a command name"""
+    def register(handler):
+        COMMANDS[name] = Command(name, handler, usage=usage, help=help, cacheable=cacheable, blocking=blocking,
+                                 cost=cost)
+        return handler
+    return register
+
+
+def streaming(name):
+    """Decorator attaching a generator handler to an already registered command"""
+    def register(handler):
+        COMMANDS[name].stream = handler
+        return handler
+    return register
+
+
+def ok(output=""):
+    return {"output": output, "error": "", "success": True}
+
+
+def fail(error):
+    return {"output": "", "error": error, "success": False}
+
+
+def dispatch(fs, command_str):
+    """Execute a command line against a session"""
+    try:
+        if not command_str.strip():
+            return ok()
+
+        parts = command_str.split()
+        name = parts[0]
+        args = parts[1:]
+
+        cmd = COMMANDS.get(name)
+        if cmd is None:
+            fs.last_command = "unknown"
+            metrics.count("unknown", fs.mode, False)
+            return fail(f"Error: Command '{name}' not found. Type 'help' for available commands.")
+
+        fs.last_command = name
+        start = time.perf_counter()
+        try:
+            result = cmd(fs, args)
+        finally:
+            metrics.observe("handler", name, fs.mode, time.perf_counter() - start)
+        metrics.count(name, fs.mode, result["success"])
+        return result
+
+    except Exception as e:
+        metrics.count(fs.last_command, fs.mode, False)
+        return fail(f"Error: {str(e)}")
+
+
+def is_blocking(fs, command_str):
+    """True if running the command line may block on disk I/O in this session"""
+    parts = command_str.split()
+    cmd = COMMANDS.get(parts[0]) if parts else None
+    if cmd is None or not cmd.blocking:
+        return False
+    if callable(cmd.blocking):
+        return cmd.blocking(fs)
+    return fs.storage.on_disk
+
+
+def command_cost(command_str):
+    """Cost of running a command line; unknown commands cost as much as a cheap one"""
+    parts = command_str.split()
+    cmd = COMMANDS.get(parts[0]) if parts else None
+    return cmd.cost if cmd is not None else 1
+
+
+def dispatch_stream(fs, command_str):
+    """Execute a command line, yielding result dicts as output becomes available.
+
+    Commands without a streaming handler yield their single dispatch() result.
+    """
+    try:
+        parts = command_str.split()
+        cmd = COMMANDS.get(parts[0]) if parts else None
+        if cmd is None or cmd.stream is None:
+            yield dispatch(fs, command_str)
+            return
+        # Only outcomes are counted: streaming time depends on how fast the client reads
+        fs.last_command = cmd.name
+        success = True
+        for chunk in cmd.stream(fs, parts[1:]):
+            success = success and chunk["success"]
+            yield chunk
+        metrics.count(cmd.name, fs.mode, success)
+    except Exception as e:
+        metrics.count(fs.last_command, fs.mode, False)
+        yield fail(f"Error: {str(e)}")
+
+
+def split_chain(line):
+    """Split a command line on ';' and '&&' outside quotes.
+
+    Returns a list of (segment, operator) pairs where operator is the separator
+    that preceded the segment (None for the first one). Empty segments are dropped.
+    """
+    segments = []
+    current = []
+    operator = None
+    quote = None
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if quote:
+            if ch == quote:
+                quote = None
+            current.append(ch)
+        elif ch in "\"'" and line.find(ch, i + 1) != -1:
+            # An unmatched quote is an apostrophe ("what's in here"), not a quote
+            quote = ch
+            current.append(ch)
+        elif ch == ";" or line.startswith("&&", i):
+            segment = "".join(current).strip()
+            if segment:
+                segments.append((segment, operator))
+            operator = ";" if ch == ";" else "&&"
+            current = []
+            i += 1 if ch == ";" else 2
+            continue
+        else:
+            current.append(ch)
+        i += 1
+    segment = "".join(current).strip()
+    if segment:
+        segments.append((segment, operator))
+    return segments
+
+
+def read_only_error(fs):
+    if fs.is_serverless:
+        return fail("Error: File system is read-only in demo mode. Download local version for full functionality.")
+    return fail("Error: Permission denied")
+
+
+LS_PAGE_SIZE = int(os.environ.get('PYTERM_LS_PAGE_SIZE', 200))
+LS_SORT_KEYS = ("name", "size", "time")
+
+
+def parse_ls_args(args):
+    """Parse ls flags: -l long format, -a show hidden, -S/-t sort by size/time, -r reverse"""
+    opts = {"long": False, "all": False, "sort": "name", "reverse": False, "cursor": None, "path": None}
+    for arg in args:
+        if arg.startswith("--sort="):
+            opts["sort"] = arg.split("=", 1)[1]
+            if opts["sort"] not in LS_SORT_KEYS:
+                raise ValueError(f"invalid sort key '{opts['sort']}' (use name, size or time)")
+        elif arg.startswith("--cursor="):
+            opts["cursor"] = arg.split("=", 1)[1]
+        elif arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag == "l":
+                    opts["long"] = True
+                elif flag == "a":
+                    opts["all"] = True
+                elif flag == "r":
+                    opts["reverse"] = True
+                elif flag == "S":
+                    opts["sort"] = "size"
+                elif flag == "t":
+                    opts["sort"] = "time"
+                else:
+                    raise ValueError(f"invalid option -- '{flag}'")
+        elif opts["path"] is None:
+            opts["path"] = arg.strip('"\'')
+    return opts
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))))
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def ls_sort_key(entry, sort):
+    """Sort key for a directory entry; only stats when the key needs it"""
+    if sort == "name":
+        return (entry.name,)
+    st = entry.stat(follow_symlinks=False)
+    if sort == "size":
+        return (-st.st_size, entry.name)  # largest first, like ls -S
+    return (-st.st_mtime_ns, entry.name)  # newest first, like ls -t
+
+
+def format_long(entry):
+    # Entries from the shared listing cache may be old: sizes and times are read fresh
+    st = os.lstat(entry.path) if isinstance(entry, os.DirEntry) else entry.stat(follow_symlinks=False)
+    if entry.is_symlink():
+        kind = "l"
+    elif entry.is_dir(follow_symlinks=False):
+        kind = "d"
+    else:
+        kind = "-"
+    mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime))
+    return f"{kind} {st.st_size:>12} {mtime} {entry.name}"
+
+
+def sorted_view(listing, sort, show_all):
+    """Keys and entries of a cached listing in ascending sort order, computed once per order"""
+    view = listing.views.get((sort, show_all))
+    if view is None:
+        items = sorted(
+            ((ls_sort_key(entry, sort), entry) for entry in listing.entries
+             if show_all or not entry.name.startswith(".")),
+            key=lambda c: c[0]
+        )
+        view = listing.views[(sort, show_all)] = ([key for key, _ in items], [entry for _, entry in items])
+    return view
+
+
+def page_from_listing(listing, opts, after, page_size):
+    """One page of a cached listing, found by bisecting on the cursor"""
+    keys, entries = sorted_view(listing, opts["sort"], opts["all"])
+    if opts["reverse"]:
+        end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+        start = max(0, end - page_size - 1)
+        page = list(zip(keys[start:end], entries[start:end]))[::-1]
+    else:
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        page = list(zip(keys[start:start + page_size + 1], entries[start:start + page_size + 1]))
+    return page
+
+
+def list_page(storage, path, opts, page_size=None):
+    """Return one page of a directory listing and the cursor of the next page.
+
+    On disk, directories up to the listing cache's size limit are scanned once
+    and later pages and sort orders are served from the shared listing cache.
+    A listing inotify doesn't watch only notices entries being added or removed,
+    not files changing size or time, so it serves name order only.
+    Larger directories (and sandbox trees) are streamed with scandir and only
+    the best page_size + 1 entries after the cursor are kept, so memory stays
+    bounded by the page size no matter how large the directory is.
+    """
+    page_size = page_size or LS_PAGE_SIZE
+    sort, reverse = opts["sort"], opts["reverse"]
+    after = decode_cursor(opts["cursor"]) if opts["cursor"] else None
+
+    page = None
+    token = None
+    if storage.on_disk:
+        listing = listing_cache.get(path)
+        if listing is None:
+            token = listing_cache.begin(path)
+        elif listing.wd is not None or sort == "name":
+            page = page_from_listing(listing, opts, after, page_size)
+
+    if page is None:
+        try:
+            with storage.scandir(path) as it:
+                if token is not None:
+                    scanned = list(itertools.islice(it, listing_cache.max_listing + 1))
+                    listing = listing_cache.store(token, scanned)
+                    token = None
+                    if listing is None and len(scanned) <= listing_cache.max_listing:
+                        # Changed during the scan: use it for this page only
+                        listing = Listing(scanned, None, None)
+                    # Just scanned, so even an unwatched listing has current stats
+                    if listing is not None:
+                        page = page_from_listing(listing, opts, after, page_size)
+                    else:
+                        it = itertools.chain(scanned, it)
+                if page is None:
+                    candidates = (
+                        (ls_sort_key(entry, sort), entry) for entry in it
+                        if opts["all"] or not entry.name.startswith(".")
+                    )
+                    if after is not None:
+                        if reverse:
+                            candidates = (c for c in candidates if c[0] < after)
+                        else:
+                            candidates = (c for c in candidates if c[0] > after)
+                    select = heapq.nlargest if reverse else heapq.nsmallest
+                    page = select(page_size + 1, candidates, key=lambda c: c[0])
+        finally:
+            if token is not None:
+                listing_cache.abandon(path)
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(list(page[-1][0]))
+    return [entry for _, entry in page], next_cursor
+
+
+def ls_path(fs, opts):
+    """Resolve the directory ls should list, or None if access is denied"""
+    if not opts["path"]:
+        return fs.current_dir
+    if not fs.is_path_safe(opts["path"]):
+        return None
+    return os.path.join(fs.current_dir, opts["path"])
+
+
+def format_entries(entries, opts):
+    if opts["long"]:
+        return "\n".join(format_long(entry) for entry in entries)
+    return "\n".join(entry.name for entry in entries)
+
+
+@command("ls", usage="ls [-l] [-a] [-S|-t] [-r]", help="List files and directories", blocking=True, cost=2)
+def cmd_ls(fs, args):
+    try:
+        opts = parse_ls_args(args)
+    except ValueError as e:
+        return fail(f"Error: ls: {e}")
+    try:
+        path = ls_path(fs, opts)
+        if path is None:
+            return fail(f"Error: Access denied to {opts['path']}")
+
+        entries, next_cursor = list_page(fs.storage, path, opts)
+        remember_directories(fs, entries)
+        if not entries and not opts["cursor"]:
+            return ok("(empty directory)")
+
+        result = ok(format_entries(entries, opts))
+        if next_cursor:
+            # The client fetches the next page by re-running ls with the cursor
+            result["cursor"] = next_cursor
+            result["more"] = " ".join(["ls"] + [a for a in args if not a.startswith("--cursor=")] + [f"--cursor={next_cursor}"])
+        return result
+    except Exception as e:
+        return fail(f"Error: {str(e)}")
+
+
+@command("cd", usage="cd <directory>", help="Change directory", blocking=True)
+def cmd_cd(fs, args):
+    try:
+        if not args:
+            if fs.is_serverless:
+                fs.current_dir = fs.base_dir
+            else:
+                fs.current_dir = os.path.expanduser('~')
+            return ok()
+
+        target = args[0].strip('"\'')
+        if target == "..":
+            parent = os.path.dirname(fs.current_dir)
+            if fs.is_serverless:
+                # Don't go above base directory in serverless
+                if len(parent) >= len(fs.base_dir):
+                    fs.current_dir = parent
+            else:
+                fs.current_dir = parent
+        elif target == "~":
+            if fs.is_serverless:
+                fs.current_dir = fs.base_dir
+            else:
+                fs.current_dir = os.path.expanduser('~')
+        else:
+            new_path = os.path.join(fs.current_dir, target)
+            if fs.storage.isdir(new_path):
+                if fs.is_path_safe(target):
+                    fs.current_dir = os.path.abspath(new_path)
+                else:
+                    return fail(f"Error: Access denied to {target}")
+            else:
+                return cd_known_directory(fs, target)
+
+        fs.path_index.add(fs.current_dir)
+        return ok()
+    except Exception as e:
+        return fail(f"Error: {str(e)}")
+
+
+def cd_known_directory(fs, target):
+    """cd to the indexed directory that best matches a name not found below the current directory"""
+    if not fs.path_index.seeded:
+        fs.path_index.seed(fs.storage, fs.base_dir)
+    for path in fs.path_index.lookup(target, fs.current_dir):
+        if not fs.storage.isdir(path):
+            # Removed or renamed outside PyTerm
+            fs.path_index.remove_tree(path)
+            continue
+        if path != fs.current_dir and fs.is_path_safe(path):
+            fs.current_dir = path
+            fs.path_index.add(path)
+            return ok(f"(matched {fs.get_relative_path()})")
+    return fail(f"Error: Directory not found: {target}")
+
+
+def remember_directories(fs, entries):
+    """Add the subdirectories seen by ls to the session's path index"""
+    for entry in entries:
+        if entry.is_dir():
+            fs.path_index.add(entry.path)
+
+
+@command("pwd", help="Show current directory")
+def cmd_pwd(fs, args):
+    # Each session tracks its own directory; the process cwd is never used
+    if fs.is_serverless:
+        return ok(fs.get_relative_path())
+    return ok(fs.current_dir)
+
+
+@command("mkdir", usage="mkdir <name>", help="Create a directory", blocking=True, cost=2)
+def cmd_mkdir(fs, args):
+    try:
+        if not args:
+            return fail("Error: Please specify a directory name.")
+
+        dir_name = args[0].strip('"\'')
+        if not fs.is_path_safe(dir_name):
+            return fail(f"Error: Access denied to {dir_name}")
+
+        new_path = os.path.join(fs.current_dir, dir_name)
+        fs.storage.makedirs(new_path, exist_ok=False)
+        fs.path_index.add(new_path)
+        if fs.storage.on_disk:
+            listing_cache.invalidate_parents(new_path)
+        return ok(f"Directory '{dir_name}' created.")
+    except FileExistsError:
+        return fail(f"Error: Directory already exists: {args[0]}")
+    except PermissionError:
+        return read_only_error(fs)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            return fail(f"Error: {e.strerror}")
+        return fail(f"Error: {str(e)}")
+    except Exception as e:
+        return fail(f"Error: {str(e)}")
+
+
+def is_large_tree(fs, path):
+    """True if removing path should run as a background job"""
+    if not fs.storage.on_disk or os.path.islink(path):
+        return False
+    return jobs.count_entries(path, jobs.RM_BACKGROUND_THRESHOLD) > jobs.RM_BACKGROUND_THRESHOLD
+
+
+def rm_args(args):
+    """rm's arguments without -r/-f: it always removes directories recursively and never prompts"""
+    return [a for a in args if not (len(a) > 1 and a.startswith("-") and set(a[1:]) <= set("rfR"))]
+
+
+@command("rm", usage="rm [-rf] <path>", help="Remove file or directory", blocking=True, cost=5)
+def cmd_rm(fs, args):
+    try:
+        args = rm_args(args)
+        if not args:
+            return fail("Error: Please specify a file or directory to remove.")
+
+        target = args[0].strip('"\'')
+        if not fs.is_path_safe(target):
+            return fail(f"Error: Access denied to {target}")
+
+        target_path = os.path.join(fs.current_dir, target)
+
+        try:
+            if fs.storage.isfile(target_path):
+                fs.storage.remove(target_path)
+                return ok(f"File '{target}' removed.")
+            elif fs.storage.isdir(target_path):
+                if is_large_tree(fs, target_path):
+                    job = jobs.start_remove_job(fs.jobs, target_path, target)
+                    return ok(f"Removing '{target}' in the background as job [{job.id}]. "
+                              f"Use 'jobs' to check progress or 'kill {job.id}' to cancel.")
+                fs.storage.rmtree(target_path)
+                return ok(f"Directory '{target}' removed.")
+            else:
+                return fail(f"Error: File or directory not found: {target}")
+        finally:
+            # Also after a partial failure; background jobs invalidate again when they finish
+            fs.path_index.remove_tree(target_path)
+            if fs.storage.on_disk:
+                listing_cache.invalidate_tree(target_path)
+    except PermissionError:
+        return read_only_error(fs)
+    except Exception as e:
+        return fail(f"Error: {str(e)}")
+
+
+RM_PROGRESS_INTERVAL = 0.5  # seconds between streamed rm progress lines
+
+
+def remove_tree_steps(path):
+    """Remove a directory tree bottom-up, yielding the running count of removed entries"""
+    removed = 0
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            os.remove(os.path.join(root, name))
+            removed += 1
+            if removed % 256 == 0:
+                yield removed
+        for name in dirs:
+            child = os.path.join(root, name)
+            if os.path.islink(child):
+                os.remove(child)
+            else:
+                os.rmdir(child)
+            removed += 1
+        yield removed
+    os.rmdir(path)
+    yield removed + 1
+
+
+@streaming("rm")
+def stream_rm(fs, args):
+    """rm that reports progress while removing a large directory tree"""
+    args = rm_args(args)
+    target = args[0].strip('"\'') if args else ""
+    target_path = os.path.join(fs.current_dir, target)
+    if (not target or not fs.storage.on_disk or not fs.is_path_safe(target) or not os.path.isdir(target_path)
+            or os.path.islink(target_path) or is_large_tree(fs, target_path)):
+        yield cmd_rm(fs, args)
+        return
+    try:
+        last_report = time.monotonic()
+        for removed in remove_tree_steps(target_path):
+            if time.monotonic() - last_report >= RM_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                yield ok(f"Removing '{target}': {removed} entries removed...")
+        yield ok(f"Directory '{target}' removed.")
+    except PermissionError:
+        yield read_only_error(fs)
+    except Exception as e:
+        yield fail(f"Error: {str(e)}")
+    finally:
+        fs.path_index.remove_tree(target_path)
+        listing_cache.invalidate_tree(target_path)
+
+
+@command("jobs", help="List background jobs and their progress")
+def cmd_jobs(fs, args):
+    session_jobs = fs.jobs.list()
+    if not session_jobs:
+        return ok("(no background jobs)")
+    return ok("\n".join(job.describe() for job in session_jobs))
+
+
+@command("kill", usage="kill <job>", help="Cancel a background job")
+def cmd_kill(fs, args):
+    if not args:
+        return fail("Error: Please specify a job id.")
+    try:
+        job = fs.jobs.get(int(args[0].lstrip("%[").rstrip("]")))
+    except ValueError:
+        job = None
+    if job is None:
+        return fail(f"Error: No such job: {args[0]}")
+    if job.status != "running":
+        return fail(f"Error: Job [{job.id}] already {job.status}")
+    job.cancel()
+    return ok(f"Job [{job.id}] cancelled.")
+
+
+FIND_MAX_RESULTS = int(os.environ.get('PYTERM_FIND_MAX_RESULTS', 1000))
+TREE_MAX_LINES = int(os.environ.get('PYTERM_TREE_MAX_LINES', 1000))
+STREAM_FLUSH_INTERVAL = 0.25  # seconds between streamed chunks of find/du/tree output
+STREAM_FLUSH_LINES = 1000
+
+
+def parse_walk_args(args):
+    """Split find/du/tree arguments into positionals and --depth=N / --limit=N options"""
+    opts = {"depth": None, "limit": None}
+    positional = []
+    for arg in args:
+        if arg.startswith("--depth=") or arg.startswith("--limit="):
+            name, value = arg[2:].split("=", 1)
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"--{name} must be a positive number")
+            opts[name] = int(value)
+        elif arg.startswith("-") and len(arg) > 1:
+            raise ValueError(f"invalid option '{arg}' (use --depth=N or --limit=N)")
+        else:
+            positional.append(arg.strip('"\''))
+    return positional, opts
+
+
+def walk_root(fs, path):
+    """Resolve the directory a walk starts from; raises ValueError with a message for the user"""
+    if path and not fs.is_path_safe(path):
+        raise ValueError(f"Access denied to {path}")
+    root = os.path.join(fs.current_dir, path) if path else fs.current_dir
+    if not fs.storage.isdir(root):
+        raise ValueError(f"Directory not found: {path}")
+    return root
+
+
+def display_path(fs, path, is_dir):
+    return os.path.relpath(path, fs.current_dir) + ("/" if is_dir else "")
+
+
+def find_lines(fs, args):
+    positional, opts = parse_walk_args(args)
+    if not positional:
+        raise ValueError("Please specify a name or pattern to find.")
+    pattern = positional[0]
+    root = walk_root(fs, positional[1] if len(positional) > 1 else None)
+    limit = opts["limit"] or FIND_MAX_RESULTS
+    if any(c in pattern for c in "*?["):
+        matches = lambda name: fnmatch.fnmatchcase(name, pattern)
+    else:
+        needle = pattern.lower()
+        matches = lambda name: needle in name.lower()
+
+    walk = Walk(fs.storage, root, max_depth=opts["depth"])
+    found = 0
+    for _, entry, is_dir, _ in walk:
+        if matches(entry.name):
+            found += 1
+            yield display_path(fs, entry.path, is_dir)
+            if found >= limit:
+                yield f"... (stopped after {limit} matches, use --limit=N for more)"
+                return
+    if not found:
+        yield f"(nothing matching '{pattern}')"
+    if walk.truncated:
+        yield f"... (search stopped at the depth or entry limit after {walk.entries} entries)"
+
+
+def du_lines(fs, args, progress=False):
+    positional, opts = parse_walk_args(args)
+    root = walk_root(fs, positional[0] if positional else None)
+    walk = Walk(fs.storage, root, max_depth=opts["depth"], max_entries=opts["limit"], with_size=True)
+    totals = {}  # top-level entry name -> [bytes, entries below it, is_dir]
+    total = 0
+    last_report = time.monotonic()
+    for depth, entry, is_dir, size in walk:
+        top = os.path.relpath(entry.path, root).split(os.sep, 1)[0]
+        counts = totals.setdefault(top, [0, 0, False])
+        counts[0] += size
+        if depth == 1:
+            counts[2] = is_dir
+        else:
+            counts[1] += 1
+        total += size
+        if progress and time.monotonic() - last_report >= RM_PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            yield f"Scanning: {walk.entries} entries, {jobs.format_size(total)} so far..."
+    for name, (size, count, is_dir) in sorted(totals.items(), key=lambda item: (-item[1][0], item[0])):
+        if is_dir:
+            yield f"{jobs.format_size(size):>10}  {name}/  ({count} {'entry' if count == 1 else 'entries'})"
+        else:
+            yield f"{jobs.format_size(size):>10}  {name}"
+    summary = f"{jobs.format_size(total):>10}  total ({walk.entries} entries)"
+    if walk.truncated:
+        summary += " - stopped at the depth or entry limit, actual usage is higher"
+    if walk.errors:
+        summary += f" - {walk.errors} directories could not be read"
+    yield summary
+
+
+def tree_output(fs, args):
+    positional, opts = parse_walk_args(args)
+    path = positional[0] if positional else None
+    root = walk_root(fs, path)
+    yield (path or ".")
+    yield from tree_lines(fs.storage, root, max_depth=opts["depth"], max_entries=opts["limit"] or TREE_MAX_LINES)
+
+
+def collect_lines(lines):
+    """Run a line generator to completion as a single result"""
+    try:
+        return ok("\n".join(lines))
+    except ValueError as e:
+        return fail(f"Error: {e}")
+
+
+def stream_lines(lines):
+    """Yield a line generator's output in chunks, at most every STREAM_FLUSH_INTERVAL seconds"""
+    batch = []
+    last_flush = time.monotonic()
+    try:
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= STREAM_FLUSH_LINES or time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+                yield ok("\n".join(batch))
+                batch = []
+                last_flush = time.monotonic()
+    except ValueError as e:
+        yield fail(f"Error: {e}")
+        return
+    if batch:
+        yield ok("\n".join(batch))
+
+
+@command("find", usage="find <pattern> [dir] [--depth=N] [--limit=N]", help="Find files and directories by name (substring or glob like *.txt)",
+         blocking=True, cost=10)
+def cmd_find(fs, args):
+    return collect_lines(find_lines(fs, args))
+
+
+@streaming("find")
+def stream_find(fs, args):
+    yield from stream_lines(find_lines(fs, args))
+
+
+@command("du", usage="du [dir] [--depth=N] [--limit=N]", help="Show disk usage of a directory and its entries",
+         blocking=True, cost=10)
+def cmd_du(fs, args):
+    return collect_lines(du_lines(fs, args))
+
+
+@streaming("du")
+def stream_du(fs, args):
+    yield from stream_lines(du_lines(fs, args, progress=True))
+
+
+@command("tree", usage="tree [dir] [--depth=N] [--limit=N]", help="Show a directory tree",
+         blocking=True, cost=5)
+def cmd_tree(fs, args):
+    return collect_lines(tree_output(fs, args))
+
+
+@streaming("tree")
+def stream_tree(fs, args):
+    yield from stream_lines(tree_output(fs, args))
+
+
+@command("history", usage="history [N] | history | grep <text>", help="Show command history (last N entries, or those matching text)",
+         blocking=lambda fs: fs.history.spilled)
+def cmd_history(fs, args):
+    if args and args[0] == "|":
+        args = args[1:]
+    if args and args[0] == "grep":
+        if len(args) < 2:
+            return fail("Error: Please specify a search pattern.")
+        pattern = " ".join(args[1:]).strip("\"'")
+        entries = fs.history.search(pattern, limit=HISTORY_SHOW)
+        if not entries:
+            return ok(f"(no commands in history matching '{pattern}')")
+    else:
+        try:
+            count = int(args[0]) if args else HISTORY_SHOW
+        except ValueError:
+            return fail(f"Error: history: {args[0]}: numeric argument required")
+        entries = fs.history.tail(count)
+        if not entries:
+            return ok("(no commands in history)")
+    return ok("\n".join(f"{number:>3}: {cmd}" for number, cmd in entries))
+
+
+@command("clear", help="Clear terminal", cacheable=True)
+def cmd_clear(fs, args):
+    return ok("CLEAR_TERMINAL")
+
+
+@command("mode", help="Show current mode information", cacheable=True)
+def cmd_mode(fs, args):
+    mode_info = fs.get_mode_info()
+    output = f"Mode: {mode_info['mode']}\n"
+    output += f"Description: {mode_info['description']}\n"
+    output += f"Note: {mode_info['warning']}"
+    return ok(output)
+
+
+@command("sysinfo", help="Show system information", cost=2)
+def cmd_sysinfo(fs, args):
+    try:
+        if fs.is_serverless:
+            # Limited system info for serverless environment
+            output = "--- System Information (Serverless) ---\n"
+            output += f"Platform: {platform.system()}\n"
+            output += f"Python Version: {platform.python_version()}\n"
+            output += f"Mode: Sandbox Environment\n"
+            usage = fs.storage.usage()
+            if usage:
+                output += f"Sandbox Storage: {jobs.format_size(usage['used'])} of {jobs.format_size(usage['quota'])} used\n"
+            output += "Note: Limited system access in cloud mode"
+            return ok(output)
+
+        # Full system info for local environment, answered from the background sampler
+        from sysmetrics import get_sampler
+        snapshot = get_sampler().snapshot()
+        output = "--- System Information ---\n"
+        output += f"Platform: {platform.system()} {platform.release()}\n"
+        output += f"Python Version: {platform.python_version()}\n"
+        if snapshot is None:
+            output += "Metrics: sampling started, run sysinfo again in a moment"
+            return ok(output)
+        averages = snapshot["averages"]
+        output += "CPU Usage: " + " | ".join(f"{averages[w]['cpu']:.1f}% ({w}s)" for w in sorted(averages)) + "\n"
+        output += "Process CPU: " + " | ".join(f"{averages[w]['process_cpu']:.1f}% ({w}s)" for w in sorted(averages)) + "\n"
+        output += "Memory Usage: " + " | ".join(f"{averages[w]['memory']:.1f}% ({w}s)" for w in sorted(averages)) + "\n"
+        output += f"Available Memory: {snapshot['memory_available'] / (1024**3):.1f} GB\n"
+        output += f"Process Memory: {snapshot['process_rss'] / (1024**2):.1f} MB\n"
+        output += f"Disk Usage: {snapshot['disk']:.1f}%"
+        return ok(output)
+    except ImportError:
+        # Fallback if psutil is not available
+        output = "--- System Information (Basic) ---\n"
+        output += f"Platform: {platform.system()}\n"
+        output += f"Python Version: {platform.python_version()}\n"
+        output += "Note: Install 'psutil' for detailed system metrics"
+        return ok(output)
+    except Exception as e:
+        return fail(f"Error: Could not fetch system info: {str(e)}")
+
+
+@command("stats", help="Show command counts and per-stage latencies of this server process")
+def cmd_stats(fs, args):
+    return ok(metrics.summary())
+
+
+NL_EXAMPLES = """You can also use natural language! Try:
+- "show me what's in this directory"
+- "create a folder called test"
+- "go to the documents folder"
+- "go back" or "go up" (same as cd ..)
+- "where am I right now?"
+- "delete the temp folder"
+- "show system info" or "computer info\""""
+
+
+@command("help", help="Show this help message", cacheable=True)
+def cmd_help(fs, args):
+    mode_info = fs.get_mode_info()
+    listing = "\n".join(f"{cmd.usage} - {cmd.help}" for cmd in COMMANDS.values())
+    help_text = f"""Available commands:
+{listing}
+
+Current Mode: {mode_info['mode']}
+{mode_info['description']}
+
+{NL_EXAMPLES}
+
+{'Note: ' + mode_info['warning']}"""
+    return ok(help_text)
@@ -0,0 +1,114 @@
+"""Compact binary encoding of /execute results for automated clients.
+
+Clients opt in with "Accept: application/x-pyterm-compact". A response is a
+version byte, a flags byte and a sequence of UTF-8 strings, each prefixed
+with its length in bytes as an unsigned LEB128 varint:
+
+    output, error, prompt                   always
+    interpretation                          if flags & INTERPRETATION
+    more                                    if flags & MORE
+    mode tag, mode, description, warning    if flags & MODE
+    other result keys as a JSON object      if flags & EXTRA
+
+success is flags & SUCCESS. The session mode never changes for a session,
+yet JSON responses repeat it every time; here it is sent only when the tag
+the client sends in the X-PyTerm-Mode header differs from the current one,
+so in practice only on a client's first request.
+"""
+import json
+import zlib
+from functools import lru_cache
+
+COMPACT_MIMETYPE = 'application/x-pyterm-compact'
+VERSION = 1
+
+SUCCESS = 1
+INTERPRETATION = 2
+MORE = 4
+MODE = 8
+EXTRA = 16
+
+# Keys with a field of their own; anything else goes into the EXTRA object
+FIELDS = {"output", "error", "success", "prompt", "interpretation", "more", "mode"}
+
+
+@lru_cache(maxsize=16)
+def _tag(mode, description, warning):
+    text = "\0".join((mode, description, warning))
+    return f"{zlib.crc32(text.encode()):08x}"
+
+
+def mode_tag(mode):
+    """Short tag identifying a mode dict, sent back by clients to skip repeats"""
+    return _tag(mode.get("mode", ""), mode.get("description", ""), mode.get("warning", ""))
+
+
+def _write(out, text):
+    data = text.encode()
+    length = len(data)
+    while length >= 0x80:
+        out.append(length & 0x7f | 0x80)
+        length >>= 7
+    out.append(length)
+    out += data
+
+
+def encode(result, known_mode_tag=None):
+    """Encode a result dict, leaving out the mode if the client already has it"""
+    flags = SUCCESS if result.get("success") else 0
+    fields = [result.get("output", ""), result.get("error", ""), result.get("prompt", "")]
+    if result.get("interpretation"):
+        flags |= INTERPRETATION
+        fields.append(result["interpretation"])
+    if result.get("more"):
+        flags |= MORE
+        fields.append(result["more"])
+    mode = result.get("mode")
+    if mode:
+        tag = mode_tag(mode)
+        if tag != known_mode_tag:
+            flags |= MODE
+            fields += [tag, mode.get("mode", ""), mode.get("description", ""), mode.get("warning", "")]
+    extra = {key: value for key, value in result.items() if key not in FIELDS}
+    if extra:
+        flags |= EXTRA
+        fields.append(json.dumps(extra))
+
+    out = bytearray((VERSION, flags))
+    for field in fields:
+        _write(out, field)
+    return bytes(out)
+
+
+def decode(data):
+    """Decode a response back into a result dict; "mode" and "mode_tag" are only present if sent"""
+    if not data or data[0] != VERSION:
+        raise ValueError("Unsupported compact response version")
+    flags = data[1]
+    pos = 2
+
+    def read():
+        nonlocal pos
+        length = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            length |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        text = data[pos:pos + length].decode()
+        pos += length
+        return text
+
+    result = {"success": bool(flags & SUCCESS), "output": read(), "error": read(), "prompt": read()}
+    if flags & INTERPRETATION:
+        result["interpretation"] = read()
+    if flags & MORE:
+        result["more"] = read()
+    if flags & MODE:
+        result["mode_tag"] = read()
+        result["mode"] = {"mode": read(), "description": read(), "warning": read()}
+    if flags & EXTRA:
+        result.update(json.loads(read()))
+    return result
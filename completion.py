@@ -0,0 +1,130 @@
+"""Tab completion of command names and paths for /complete.
+
+The first word of a command completes to command names from the registry;
+later words complete to paths below the session's current directory (only
+directories after cd). Names are looked up by bisecting a sorted index of the
+directory being completed into:
+- on disk, the name-sorted view of the shared ls listing cache, so completion
+  and ls share one scan and inotify/mtime invalidation per directory.
+  Directories too large for the listing cache are scanned on every request
+- in sandboxes, a small per-session cache of listings, each checked against
+  the directory's mtime (every change to an in-memory directory updates it)
+"""
+import bisect
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import commands
+from listing_cache import Listing, listing_cache
+
+COMPLETE_MAX_RESULTS = int(os.environ.get('PYTERM_COMPLETE_MAX_RESULTS', 100))
+COMPLETE_CACHE_DIRS = int(os.environ.get('PYTERM_COMPLETE_CACHE_DIRS', 16))
+
+# A new command starts after ';' or '&&'
+COMMAND_SEPARATOR_RE = re.compile(r';|&&')
+
+
+class CompletionCache:
+    """Listings of the sandbox directories a session completed in recently"""
+
+    def __init__(self, max_dirs=COMPLETE_CACHE_DIRS):
+        self.max_dirs = max(1, max_dirs)
+        self._listings = OrderedDict()  # path -> Listing whose stat is the directory's mtime
+        self._lock = threading.Lock()
+
+    def get(self, storage, path):
+        mtime_ns = storage.stat(path).st_mtime_ns
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None and listing.stat == mtime_ns:
+                self._listings.move_to_end(path)
+                return listing
+        with storage.scandir(path) as it:
+            listing = Listing(list(it), mtime_ns, None)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_dirs:
+                self._listings.popitem(last=False)
+        return listing
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+
+def disk_listing(path):
+    """Listing of a directory from the shared listing cache, scanning it on a miss"""
+    listing = listing_cache.get(path)
+    if listing is not None:
+        return listing
+    token = listing_cache.begin(path)
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        if token is not None:
+            listing_cache.abandon(path)
+        raise
+    listing = listing_cache.store(token, entries) if token is not None else None
+    return listing or Listing(entries, None, None)
+
+
+def names_with_prefix(listing, prefix, dirs_only=False):
+    """(name, is_dir) of the entries of a listing starting with prefix, in name order"""
+    keys, entries = commands.sorted_view(listing, "name", True)
+    for i in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+        entry = entries[i]
+        if not entry.name.startswith(prefix):
+            break
+        # Hidden entries only when asked for, like shells do
+        if entry.name.startswith(".") and not prefix.startswith("."):
+            continue
+        is_dir = entry.is_dir()
+        if dirs_only and not is_dir:
+            continue
+        yield entry.name, is_dir
+
+
+def complete_path(fs, word, dirs_only=False):
+    directory, _, prefix = word.rpartition("/")
+    if word.startswith("/"):
+        directory += "/"
+    typed = directory.rstrip("/") + "/" if directory else ""
+    if not fs.is_path_safe(directory or "."):
+        return []
+    path = os.path.join(fs.current_dir, directory)
+    if not fs.storage.isdir(path):
+        return []
+    if fs.storage.on_disk:
+        listing = disk_listing(path)
+    else:
+        listing = fs.completions.get(fs.storage, os.path.normpath(path))
+    completions = []
+    for name, is_dir in names_with_prefix(listing, prefix, dirs_only):
+        completions.append(typed + name + ("/" if is_dir else ""))
+        if len(completions) > COMPLETE_MAX_RESULTS:
+            break
+    return completions
+
+
+def complete(fs, line):
+    """Completions of the last word of a command line.
+
+    Returns {"word": the word being completed, "completions": [...], "truncated": bool};
+    each completion replaces the word, and directories end in "/".
+    """
+    line = COMMAND_SEPARATOR_RE.split(line)[-1].lstrip()
+    words = line.split(" ")
+    word = words[-1]
+    if len(words) == 1:
+        completions = [name for name in sorted(commands.COMMANDS) if name.startswith(word)]
+    else:
+        completions = complete_path(fs, word, dirs_only=words[0] == "cd")
+    return {
+        "word": word,
+        "completions": completions[:COMPLETE_MAX_RESULTS],
+        "truncated": len(completions) > COMPLETE_MAX_RESULTS,
+    }
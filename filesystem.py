@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+import commands
+from completion import CompletionCache
+from history import CommandHistory, history_dir
+from jobs import JobTable
+from path_index import PathIndex
+from storage import DiskStorage, sandbox_storage
+
+# Detect if we're running on a serverless platform or locally
+def is_serverless_environment():
+    """Detect if running on serverless platform (Vercel, Heroku, etc.)"""
+    return (
+        os.environ.get('VERCEL') or 
+        os.environ.get('DYNO') or 
+        os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or
+        '/var/task' in os.getcwd() or
+        '/tmp' in tempfile.gettempdir() or
+        os.access(os.getcwd(), os.W_OK) == False
+    )
+
+def start_metrics_sampler():
+    """Start the sysinfo sampler early so the first sysinfo already has data"""
+    try:
+        from sysmetrics import get_sampler
+        get_sampler()
+    except ImportError:
+        pass
+
+class FileSystemManager:
+    def __init__(self, serverless=None, base_dir=None):
+        self.is_serverless = is_serverless_environment() if serverless is None else serverless
+        if self.is_serverless:
+            # Virtual file system for serverless (in memory unless PYTERM_SANDBOX_STORAGE=disk)
+            self.storage = sandbox_storage()
+            self.base_dir = self.storage.root
+            self.current_dir = self.base_dir
+            self.mode = "SANDBOX"
+        else:
+            # Real file system for local
+            self.base_dir = os.path.abspath(base_dir) if base_dir else os.getcwd()
+            self.current_dir = self.base_dir
+            self.storage = DiskStorage(self.base_dir)
+            self.mode = "REAL OS"
+            start_metrics_sampler()
+        
+        self.history = CommandHistory(spill_dir=history_dir(self.is_serverless))
+        self.history_saved = 0  # entries already written to the shared session state backend
+        self.last_command = "unknown"  # name of the last command dispatched, used as a metrics label
+        self.jobs = JobTable()
+        self.path_index = PathIndex()  # directories seen by this session, for partial cd targets
+        self.completions = CompletionCache()  # sandbox listings used by tab completion
+    
+    def cleanup(self):
+        """Stop background jobs, release the sandbox storage and delete spilled history of this session"""
+        self.jobs.cancel_all()
+        self.storage.cleanup()
+        self.history.cleanup()
+        self.completions.clear()
+        
+    def get_relative_path(self):
+        """Get the current path relative to the base directory"""
+        if self.current_dir == self.base_dir:
+            return "~"
+        try:
+            rel_path = os.path.relpath(self.current_dir, self.base_dir)
+            return f"~/{rel_path}"
+        except ValueError:
+            # Handle different drives on Windows
+            return self.current_dir
+    
+    def get_mode_info(self):
+        """Get information about current mode"""
+        if self.is_serverless:
+            return {
+                "mode": "SANDBOX",
+                "description": "Virtual file system - safe for demonstrations",
+                "warning": "Files are temporary and will be lost when session ends"
+            }
+        else:
+            return {
+                "mode": "REAL OS",
+                "description": "Direct access to your actual file system",
+                "warning": "Commands will create/modify real files on your computer"
+            }
+    
+    def is_path_safe(self, path):
+        """Check if path is safe for operations"""
+        if self.is_serverless:
+            # In serverless, restrict to temp directory
+            abs_path = os.path.abspath(os.path.join(self.current_dir, path))
+            return abs_path.startswith(self.base_dir)
+        else:
+            # Local mode - more permissive but still some restrictions
+            restricted_paths = [
+                '/etc', '/sys', '/proc', '/dev', 
+                'C:\\Windows', 'C:\\System32', 'C:\\Program Files'
+            ]
+            abs_path = os.path.abspath(os.path.join(self.current_dir, path))
+            return not any(abs_path.startswith(restricted) for restricted in restricted_paths)
+    
+    def execute_command(self, command_str):
+        """Execute a command in the file system"""
+        return commands.dispatch(self, command_str)
+    
+    def execute_command_stream(self, command_str):
+        """Execute a command, yielding result chunks as they are produced"""
+        return commands.dispatch_stream(self, command_str)
@@ -0,0 +1,167 @@
+"""Bounded command history of a session.
+
+The most recent entries are kept in memory in a ring buffer. When it is full,
+the oldest entry is appended to a per-session spill file and only its byte
+offset stays in memory, so `history N`, `history | grep` and `!n` recall read
+back just the entries they need. Without a spill directory, entries pushed out
+of the buffer are forgotten and only their count is kept.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+from array import array
+from collections import deque
+from itertools import islice
+
+HISTORY_SIZE = int(os.environ.get('PYTERM_HISTORY_SIZE', 500))
+# Spill directory for SANDBOX sessions; REAL OS sessions default to a temporary directory
+HISTORY_DIR = os.environ.get('PYTERM_HISTORY_DIR', '')
+HISTORY_SHOW = 100  # entries listed by a bare `history`
+
+RECALL_RE = re.compile(r'^!(!|-?\d+)$')
+
+
+def history_dir(serverless):
+    """Spill directory for a new session's history, or None to keep memory only"""
+    if HISTORY_DIR:
+        return HISTORY_DIR
+    if serverless:
+        return None
+    return os.path.join(tempfile.gettempdir(), 'pyterm-history')
+
+
+class CommandHistory:
+    """Append-only list of command lines with a bounded in-memory part.
+
+    Supports len(), indexing and slicing (0-based), append() and extend(), so
+    it can stand in for the plain list it replaces. Slices skip forgotten entries.
+    """
+
+    def __init__(self, maxlen=HISTORY_SIZE, spill_dir=None):
+        self.maxlen = max(1, maxlen)
+        self.spill_dir = spill_dir
+        self.spill_path = None
+        self._recent = deque()
+        self._first = 0  # index of the oldest entry still in memory
+        self._offsets = array('q')  # byte offset of every spilled entry, by index
+        self._file = None
+        self._lock = threading.RLock()
+
+    @property
+    def spilled(self):
+        """True once older entries are read back from the spill file"""
+        return len(self._offsets) > 0
+
+    def __len__(self):
+        return self._first + len(self._recent)
+
+    def __iter__(self):
+        for _, command in self.entries():
+            yield command
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            commands = (self.get(i) for i in range(*key.indices(len(self))))
+            return [command for command in commands if command is not None]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("history index out of range")
+        return self.get(key)
+
+    def append(self, command):
+        with self._lock:
+            if len(self._recent) == self.maxlen:
+                self._spill(self._recent.popleft())
+                self._first += 1
+            self._recent.append(command)
+
+    def extend(self, commands):
+        for command in commands:
+            self.append(command)
+
+    def _spill(self, command):
+        if self.spill_dir is None:
+            return
+        if self._file is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = os.path.join(self.spill_dir, f"history-{uuid.uuid4().hex}.jsonl")
+            self._file = open(self.spill_path, 'a+b')
+        self._file.seek(0, os.SEEK_END)
+        self._offsets.append(self._file.tell())
+        self._file.write(json.dumps(command).encode() + b"\n")
+
+    def get(self, index):
+        """Entry at a 0-based index, or None if it was forgotten"""
+        with self._lock:
+            if index >= self._first:
+                return self._recent[index - self._first]
+            if index >= len(self._offsets):
+                return None
+            self._file.seek(self._offsets[index])
+            return json.loads(self._file.readline())
+
+    def recall(self, number):
+        """Entry by its 1-based history number, or None"""
+        if not 1 <= number <= len(self):
+            return None
+        return self.get(number - 1)
+
+    def entries(self, start=0):
+        """Yield (number, command) from entry `start` on, reading spilled entries sequentially"""
+        with self._lock:
+            spilled = len(self._offsets)
+            if self._file is not None:
+                self._file.flush()
+            recent = list(self._recent)
+            first = self._first
+        if start < spilled:
+            with open(self.spill_path, 'rb') as f:
+                f.seek(self._offsets[start])
+                for index, line in enumerate(islice(f, spilled - start), start):
+                    yield index + 1, json.loads(line)
+        for index, command in enumerate(recent, first):
+            if index >= start:
+                yield index + 1, command
+
+    def tail(self, n):
+        """The last n entries as (number, command) pairs"""
+        return list(self.entries(max(0, len(self) - n)))
+
+    def search(self, text, limit=None):
+        """(number, command) pairs containing text (case-sensitive), oldest first.
+
+        With limit, only the most recent matches are kept while scanning.
+        """
+        matches = deque(maxlen=limit)
+        for number, command in self.entries():
+            if text in command:
+                matches.append((number, command))
+        return list(matches)
+
+    def cleanup(self):
+        """Delete the spill file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                os.remove(self.spill_path)
+            self._offsets = array('q')
+
+
+def expand_recall(history, line):
+    """Resolve '!n', '!-n' and '!!' to an earlier command.
+
+    Returns the line unchanged if it is not a recall, or None if the entry doesn't exist.
+    """
+    match = RECALL_RE.match(line)
+    if not match:
+        return line
+    token = match.group(1)
+    number = len(history) if token == '!' else int(token)
+    if number < 0:
+        number += len(history) + 1
+    return history.recall(number)
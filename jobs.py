@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from listing_cache import listing_cache
+
+# Directories with more entries than this are removed by a background job
+RM_BACKGROUND_THRESHOLD = int(os.environ.get('PYTERM_RM_BACKGROUND_THRESHOLD', 2000))
+JOB_WORKERS = int(os.environ.get('PYTERM_JOB_WORKERS', 4))
+MAX_FINISHED_JOBS = 20  # finished jobs kept per session for the jobs listing
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Shared worker pool for background jobs, created on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="pyterm-job")
+    return _executor
+
+
+def format_size(num_bytes):
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class Job:
+    """A background job with progress counters and cooperative cancellation"""
+
+    def __init__(self, job_id, description):
+        self.id = job_id
+        self.description = description
+        self.status = "running"
+        self.error = ""
+        self.files_removed = 0
+        self.bytes_freed = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def add_progress(self, files, num_bytes):
+        with self._lock:
+            self.files_removed += files
+            self.bytes_freed += num_bytes
+
+    def finish(self, status, error=""):
+        self.status = status
+        self.error = error
+        self.finished = time.monotonic()
+
+    def describe(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        line = (f"[{self.id}] {self.status:<9} {self.description} - {self.files_removed} entries removed, "
+                f"{format_size(self.bytes_freed)} freed, {elapsed:.1f}s")
+        if self.error:
+            line += f" ({self.error})"
+        return line
+
+
+class JobTable:
+    """Background jobs of one session"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def create(self, description):
+        with self._lock:
+            job = Job(self._next_id, description)
+            self._jobs[job.id] = job
+            self._next_id += 1
+            finished = [j for j in self._jobs.values() if j.status != "running"]
+            for old in finished[:-MAX_FINISHED_JOBS]:
+                del self._jobs[old.id]
+            return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel_all(self):
+        for job in self.list():
+            job.cancel()
+
+
+def count_entries(path, limit):
+    """Count entries under path, stopping as soon as limit is exceeded"""
+    count = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                count += 1
+                if count > limit:
+                    return count
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return count
+
+
+def remove_subtree(path, job):
+    """Remove a directory tree bottom-up, updating job progress; stops early if cancelled"""
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        if job.cancelled:
+            return
+        if entry.is_dir(follow_symlinks=False):
+            remove_subtree(entry.path, job)
+        else:
+            size = entry.stat(follow_symlinks=False).st_size
+            os.remove(entry.path)
+            job.add_progress(1, size)
+    if not job.cancelled:
+        os.rmdir(path)
+        job.add_progress(1, 0)
+
+
+def run_remove_job(job, path):
+    """Remove path with one worker task per top-level subdirectory"""
+    try:
+        futures = []
+        with os.scandir(path) as it:
+            entries = list(it)
+        executor = get_executor()
+        for entry in entries:
+            if job.cancelled:
+                break
+            if entry.is_dir(follow_symlinks=False):
+                futures.append(executor.submit(remove_subtree, entry.path, job))
+            else:
+                size = entry.stat(follow_symlinks=False).st_size
+                os.remove(entry.path)
+                job.add_progress(1, size)
+        for future in futures:
+            future.result()
+        if job.cancelled:
+            job.finish("cancelled")
+            return
+        os.rmdir(path)
+        job.add_progress(1, 0)
+        job.finish("done")
+    except Exception as e:
+        job.finish("failed", str(e))
+    finally:
+        listing_cache.invalidate_tree(path)
+
+
+def start_remove_job(jobs, path, name):
+    """Start removing a directory tree in the background and return its job"""
+    job = jobs.create(f"rm {name}")
+    thread = threading.Thread(target=run_remove_job, args=(job, path), name=f"pyterm-rm-{job.id}", daemon=True)
+    thread.start()
+    return job
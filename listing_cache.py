@@ -0,0 +1,307 @@
+"""Shared cache of on-disk directory listings.
+
+ls on a directory scans it once; the entries are kept here, keyed by
+absolute path, and later listings (any page, any sort order) are served from
+memory. The cache is shared by all sessions of the process and bounded by the
+total number of entries it holds; least recently used listings are dropped
+first, and directories too large to fit are never cached.
+
+A cached listing is dropped when:
+- inotify reports a change in the directory or to one of its files (Linux;
+  watched through ctypes while the listing is cached)
+- the directory's mtime or inode differs from the one seen when it was
+  scanned, or it no longer exists (one stat per lookup). Without inotify this
+  is the only check: directories changed within the last second are then not
+  cached, since a second change in the same clock tick would go unnoticed.
+  Appending to a file doesn't change the directory's mtime either, so ls
+  sorts unwatched listings by name only and ls -l re-stats the entries shown
+- PyTerm's own mkdir/rm changed it (invalidate_parents / invalidate_tree)
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+LISTING_CACHE_ENTRIES = int(os.environ.get('PYTERM_LISTING_CACHE_ENTRIES', 200000))
+USE_INOTIFY = os.environ.get('PYTERM_LISTING_CACHE_INOTIFY', '1') != '0'
+RACY_WINDOW_NS = 1_000_000_000
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Directory watches on one inotify instance; a daemon thread reports changes to on_change(path)"""
+
+    def __init__(self, on_change, on_overflow):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._on_change = on_change
+        self._on_overflow = on_overflow
+        self._paths = {}  # watch descriptor -> path
+        self._refs = {}  # watch descriptor -> users; watching a directory twice returns the same descriptor
+        self._lock = threading.Lock()
+        threading.Thread(target=self._read_events, name="pyterm-inotify", daemon=True).start()
+
+    def watch(self, path):
+        """Add a watch and return its descriptor, or None if the kernel refuses (e.g. watch limit)"""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return None
+        with self._lock:
+            self._paths[wd] = path
+            self._refs[wd] = self._refs.get(wd, 0) + 1
+        return wd
+
+    def unwatch(self, wd):
+        with self._lock:
+            refs = self._refs.get(wd, 0) - 1
+            if refs < 0:
+                return
+            if refs > 0:
+                self._refs[wd] = refs
+                return
+            del self._refs[wd]
+            self._paths.pop(wd, None)
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except InterruptedError:
+                continue
+            except OSError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self._on_overflow()
+                    continue
+                with self._lock:
+                    if mask & IN_IGNORED:
+                        # The kernel dropped the watch (directory deleted)
+                        self._refs.pop(wd, None)
+                        path = self._paths.pop(wd, None)
+                    else:
+                        path = self._paths.get(wd)
+                if path is not None:
+                    self._on_change(path)
+
+
+class Listing:
+    """Entries of one directory scan plus the sorted views computed from them"""
+
+    __slots__ = ("entries", "stat", "wd", "views")
+
+    def __init__(self, entries, stat, wd):
+        self.entries = entries
+        self.stat = stat
+        self.wd = wd
+        self.views = {}  # (sort, show_all) -> (keys, entries) in ascending key order
+
+
+class ListingCache:
+    """LRU cache of directory listings bounded by the total number of entries"""
+
+    def __init__(self, max_entries=LISTING_CACHE_ENTRIES, use_inotify=USE_INOTIFY):
+        self.max_entries = max_entries
+        # Larger directories would push out most of the cache
+        self.max_listing = max_entries // 4
+        self.use_inotify = use_inotify
+        self._listings = OrderedDict()
+        self._scans = {}  # path -> [invalidations seen, watch] of a scan in progress
+        self._size = 0
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._watcher_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _get_watcher(self):
+        # Watcher threads don't survive a fork, so each worker process starts its own
+        if not self.use_inotify:
+            return None
+        if self._watcher_pid != os.getpid():
+            self._watcher_pid = os.getpid()
+            try:
+                self._watcher = InotifyWatcher(self.invalidate, self.clear)
+            except (OSError, AttributeError):
+                self._watcher = None
+        return self._watcher
+
+    @property
+    def inotify(self):
+        return self._get_watcher() is not None
+
+    def get(self, path):
+        """The cached Listing of a directory if it is still valid, else None"""
+        path = os.path.abspath(path)
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is None:
+                self.misses += 1
+                return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        # The stat also catches changes whose inotify event hasn't been read yet
+        if st is None or (st.st_ino, st.st_dev, st.st_mtime_ns) != listing.stat:
+            self.invalidate(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            if path in self._listings:
+                self._listings.move_to_end(path)
+            self.hits += 1
+        return listing
+
+    def begin(self, path):
+        """Prepare to scan a directory; returns a token for store(), or None if it can't be cached"""
+        if self.max_listing <= 0:
+            return None
+        path = os.path.abspath(path)
+        watcher = self._get_watcher()
+        with self._lock:
+            scan = self._scans.setdefault(path, [0, None])
+        if watcher is not None and scan[1] is None:
+            # Watch before scanning, so changes during the scan are reported
+            wd = watcher.watch(path)
+            with self._lock:
+                if self._scans.get(path) is scan and scan[1] is None:
+                    scan[1], wd = wd, None
+            # A concurrent scan of the same directory added its watch first
+            self._release(wd)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.abandon(path)
+            return None
+        if scan[1] is None and time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            self.abandon(path)
+            return None
+        return path, scan, scan[0], (st.st_ino, st.st_dev, st.st_mtime_ns)
+
+    def store(self, token, entries):
+        """Cache a finished scan unless the directory changed since begin()"""
+        path, scan, generation, stat = token
+        with self._lock:
+            if self._scans.get(path) is not scan:
+                # Another scan of the same directory finished first
+                return None
+            del self._scans[path]
+            if scan[0] != generation or len(entries) > self.max_listing:
+                released = [scan[1]]
+                listing = None
+            else:
+                listing = Listing(entries, stat, scan[1])
+                old = self._listings.pop(path, None)
+                released = [old.wd] if old is not None else []
+                self._size -= len(old.entries) if old is not None else 0
+                self._listings[path] = listing
+                self._size += len(entries)
+                while self._size > self.max_entries and len(self._listings) > 1:
+                    _, oldest = self._listings.popitem(last=False)
+                    self._size -= len(oldest.entries)
+                    self.evictions += 1
+                    released.append(oldest.wd)
+        for wd in released:
+            self._release(wd)
+        return listing
+
+    def abandon(self, path):
+        """Give up caching a directory whose scan was started with begin()"""
+        with self._lock:
+            scan = self._scans.pop(os.path.abspath(path), None)
+        if scan is not None:
+            self._release(scan[1])
+
+    def _release(self, wd):
+        if wd is not None and self._watcher is not None:
+            self._watcher.unwatch(wd)
+
+    def invalidate(self, path):
+        """Drop the listing of one directory"""
+        path = os.path.abspath(path)
+        with self._lock:
+            listing = self._listings.pop(path, None)
+            if listing is not None:
+                self._size -= len(listing.entries)
+                self.invalidations += 1
+            scan = self._scans.get(path)
+            wd = None
+            if scan is not None:
+                # The scan in progress may have missed this change
+                scan[0] += 1
+                wd, scan[1] = scan[1], None
+        self._release(wd)
+        if listing is not None:
+            self._release(listing.wd)
+
+    def invalidate_tree(self, path):
+        """Drop the listings of a directory, everything below it and its parent (after rm)"""
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            paths = [p for p in list(self._listings) + list(self._scans) if p == path or p.startswith(prefix)]
+        for p in paths + [os.path.dirname(path)]:
+            self.invalidate(p)
+
+    def invalidate_parents(self, path):
+        """Drop the listings of every ancestor of a path (after mkdir, which may create several levels)"""
+        path = os.path.abspath(path)
+        parent = os.path.dirname(path)
+        while parent != path:
+            self.invalidate(parent)
+            path, parent = parent, os.path.dirname(parent)
+
+    def clear(self):
+        with self._lock:
+            paths = list(self._listings) + list(self._scans)
+        for path in paths:
+            self.invalidate(path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directories": len(self._listings),
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "inotify": self._watcher is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Listings of this process, shared by all sessions
+listing_cache = ListingCache()
@@ -1,43 +1,104 @@
 import os
-import shutil
-import subprocess
 import sys
 import re
+from cache import LRUCache
+from commands import COMMANDS
 
-def interpret_command(query):
-    """
-    Interprets a natural language query and returns the corresponding terminal command.
-    
-    Available commands: ls, cd <directory>, pwd, mkdir <directory_name>, rm <path>, sysinfo
-    
-    Args:
-        query (str): Natural language query describing the desired action
-        
-    Returns:
-        str: The corresponding terminal command, or empty string if ambiguous/unmappable
+# --- Intent tables (compiled once at import time) ---
+# Phrase intents are matched as plain substrings of the lowercased query, word
+# intents against whole words. Longer phrases that already contain a shorter
+# phrase of the same intent ("where am i right now" / "where am i") are implied
+# by it and need no entry of their own.
+PHRASE_INTENTS = {
+    "ls": ["show me", "list", "what's in", "whats in", "see files", "ls", "there?"],
+    "pwd": ["where am i", "current directory", "pwd", "current path"],
+    "cd ..": ["back", "up", "parent directory", "previous directory", "cd .."],
+    "sysinfo": [
+        "system info", "sysinfo", "sys info", "computer info", "pc info", "hardware info",
+        "cpu usage", "memory usage", "system stats", "performance info"
+    ],
+}
+
+LS_BLOCKERS = frozenset(["create", "make", "delete", "remove", "go", "cd", "where"])
+MKDIR_WORDS = frozenset(["create", "make"])
+RM_WORDS = frozenset(["delete", "remove", "rm"])
+CD_WORDS = frozenset(["go", "navigate", "cd", "enter", "change"])
+CD_LEADING_WORDS = frozenset(["go", "cd", "enter"])
+CONTAINER_WORDS = frozenset(["folder", "directory"])
+CD_TARGET_WORDS = frozenset(["folder", "directory", "into", "to"])
+TARGET_MARKERS = frozenset(["folder", "directory", "file", "into", "to"])
+SKIP_WORDS = frozenset(["the", "a", "an", "called", "named"])
+DETERMINERS = frozenset(["my", "your", "our", "their", "his", "her", "its", "this", "that", "these", "those",
+                         "some", "new", "here", "there"])
+NOT_NAMES = SKIP_WORDS | TARGET_MARKERS | MKDIR_WORDS | RM_WORDS | CD_WORDS | DETERMINERS
+
+QUOTED_TARGET_RE = re.compile(r'["\']([^"\']+)["\']')
+
+
+def _build_intent_regex(phrase_intents):
+    """Compile every intent phrase into one zero-width scanning regex.
+
+    The phrases are merged into a character trie so each position of the query
+    is tested with a single branch per character, and the whole match sits in a
+    lookahead so overlapping phrases are all found in one left-to-right pass.
+    Each phrase ends in an empty named group whose name maps back to its intent.
+    No phrase of one intent is a prefix of a phrase of another, so the intent
+    matched at any position is unique.
     """
-    raw_query = query.strip()
-    query = raw_query.lower()
-    words = query.split()
+    trie = {}
+    group_intents = {}
+    for i, (intent, phrases) in enumerate(phrase_intents.items()):
+        for j, phrase in enumerate(phrases):
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = f"p{i}_{j}"
+            group_intents[f"p{i}_{j}"] = intent
+
+    def emit(node):
+        branches = []
+        for ch, child in sorted(node.items()):
+            if ch == "":
+                branches.append(f"(?P<{child}>)")
+            else:
+                branches.append(re.escape(ch) + emit(child))
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    first_chars = re.escape("".join(sorted(trie)))
+    return re.compile(f"(?=[{first_chars}])(?={emit(trie)})"), group_intents
+
+
+INTENT_RE, INTENT_GROUPS = _build_intent_regex(PHRASE_INTENTS)
 
-    # --- Helper: extract quoted or named target ---
+
+def match_intents(query):
+    """Return the set of phrase intents present in an already-lowercased query"""
+    return {INTENT_GROUPS[match.lastgroup] for match in INTENT_RE.finditer(query)}
+
+
+def extract_target(raw_query, raw_words, words, name_before_container=False):
+    """Extract the quoted or named target of a query from its pre-split words.
+
+    name_before_container (cd only) takes "reports" from "go to the reports folder".
+    """
     target = ""
-    match = re.search(r'["\']([^"\']+)["\']', raw_query)  # preserve case inside quotes
+    match = QUOTED_TARGET_RE.search(raw_query)  # preserve case inside quotes
     if match:
         target = match.group(1)
     else:
-        skip_words = {"the", "a", "an", "called", "named"}
         for i, w in enumerate(words):
-            if w in ["folder", "directory", "file", "into", "to"]:
+            if w in TARGET_MARKERS:
                 if i + 1 < len(words):
-                    nxt = raw_query.split()[i + 1]  # preserve case
-                    if nxt.lower() not in skip_words:
-                        target = nxt
+                    if words[i + 1] not in SKIP_WORDS:
+                        target = raw_words[i + 1]  # preserve case
                         break
+        if (name_before_container and not target and len(words) > 1 and words[-1] in CONTAINER_WORDS
+                and words[-2] not in NOT_NAMES):
+            # "go to the reports folder": the name comes right before the container word
+            target = raw_words[-2]
         if not target and len(words) > 1:
-            last = raw_query.split()[-1]
-            if last.lower() not in skip_words:
-                target = last
+            if words[-1] not in SKIP_WORDS:
+                target = raw_words[-1]
 
     # clean target
     target = target.strip("\"'")
@@ -45,151 +106,128 @@ def interpret_command(query):
     # wrap multi-word names in quotes
     if " " in target:
         target = f"\"{target}\""
+    return target
+
+
+def interpret_command(query):
+    """
+    Interprets a natural language query and returns the corresponding terminal command.
+    
+    Available commands: ls, cd <directory>, pwd, mkdir <directory_name>, rm <path>, sysinfo
+    
+    Args:
+        query (str): Natural language query describing the desired action
+        
+    Returns:
+        str: The corresponding terminal command, or empty string if ambiguous/unmappable
+    """
+    raw_query = query.strip()
+    query = raw_query.lower()
+    raw_words = raw_query.split()
+    words = query.split()
+    word_set = set(words)
+
+    # A registered command with option flags ("ls -la", "ls --cursor=...") or a pipe
+    # ("history | grep cd") is meant literally, not as natural language
+    if words and words[0] in COMMANDS and any(w.startswith("-") or w == "|" for w in words[1:]):
+        return ""
+
+    intents = match_intents(query)
 
     # --- ls command ---
-    if any(phrase in query for phrase in ["show me", "list", "what's in", "whats in", "see files", "ls", "there?"]):
-        if not any(w in words for w in ["create", "make", "delete", "remove", "go", "cd", "where"]):
-            return "ls"
+    if "ls" in intents and word_set.isdisjoint(LS_BLOCKERS):
+        return "ls"
 
     # --- pwd command ---
-    if any(phrase in query for phrase in [
-        "where am i", "current directory", "pwd", "current path",
-        "where am i right now", "show me the current path"
-    ]):
+    if "pwd" in intents:
         return "pwd"
 
     # --- mkdir command ---
-    if any(w in words for w in ["create", "make"]):
-        if "folder" in words or "directory" in words:
-            return f'mkdir {target}'
-        if len(words) > 1 and words[0] in ["create", "make"]:
-            return f'mkdir {target}'
+    if not word_set.isdisjoint(MKDIR_WORDS):
+        if not word_set.isdisjoint(CONTAINER_WORDS) or (len(words) > 1 and words[0] in MKDIR_WORDS):
+            return f'mkdir {extract_target(raw_query, raw_words, words)}'
 
     # --- rm command ---
-    if any(w in words for w in ["delete", "remove", "rm"]):
+    if not word_set.isdisjoint(RM_WORDS):
+        target = extract_target(raw_query, raw_words, words)
         if target:
             return f'rm {target}'
 
     # --- cd .. command (go back/up) ---
-    if any(phrase in query for phrase in [
-        "go back", "go up", "back", "up one", "parent directory", 
-        "previous directory", "up", "cd ..", "move back", "step back"
-    ]):
+    if "cd .." in intents:
         return "cd .."
 
     # --- cd command ---
-    if any(w in words for w in ["go", "navigate", "cd", "enter", "change"]):
-        if "directory" in words or "folder" in words or "into" in words or "to" in words:
-            return f'cd {target}'
-        if len(words) > 1 and words[0] in ["go", "cd", "enter"]:
-            return f'cd {target}'
+    if not word_set.isdisjoint(CD_WORDS):
+        if not word_set.isdisjoint(CD_TARGET_WORDS) or (len(words) > 1 and words[0] in CD_LEADING_WORDS):
+            return f'cd {extract_target(raw_query, raw_words, words, name_before_container=True)}'
 
     # --- sysinfo command ---
-    if any(phrase in query for phrase in [
-        "system info", "system information", "sysinfo", "sys info",
-        "show system info", "computer info", "pc info", "hardware info",
-        "cpu usage", "memory usage", "system stats", "performance info"
-    ]):
+    if "sysinfo" in intents:
         return "sysinfo"
 
     return ""  # no match
 
+
+# Users repeat the same few phrases, so interpretations are memoized. The key is
+# the stripped query with its case preserved, since targets keep their case.
+interpret_cache = LRUCache(int(os.environ.get('PYTERM_INTERPRET_CACHE_SIZE', 1024)))
+MAX_CACHED_QUERY_LENGTH = 256
+
+
+def cached_interpret_command(query):
+    """interpret_command with an LRU cache in front of it"""
+    key = query.strip()
+    if len(key) > MAX_CACHED_QUERY_LENGTH:
+        return interpret_command(key)
+    result = interpret_cache.get(key)
+    if result is None:
+        result = interpret_command(key)
+        interpret_cache.put(key, result)
+    return result
+
 def main():
-    command_history = []
+    from filesystem import FileSystemManager
+    from history import expand_recall
+
+    # The CLI always works on the real file system, starting in the current directory
+    fs = FileSystemManager(serverless=False)
     while True:
-        prompt = f"PyTerm:{os.getcwd()} $ "
+        prompt = f"PyTerm:{fs.current_dir} $ "
         command_input = input(prompt)
         
-        if not command_input:
+        if not command_input.strip():
             continue
         
-        command_history.append(command_input)
+        # '!n', '!-n' and '!!' re-run an earlier command
+        recalled = expand_recall(fs.history, command_input.strip())
+        if recalled is None:
+            print(f"Error: {command_input.strip()}: event not found")
+            continue
+        if recalled != command_input.strip():
+            print(recalled)
+            command_input = recalled
         
-        interpreted_command = interpret_command(command_input)
-        final_command_str = interpreted_command if interpreted_command else command_input
+        fs.history.append(command_input)
         
-        parts = final_command_str.split()
-        command = parts[0]
-        args = parts[1:]
+        interpreted_command = cached_interpret_command(command_input)
+        final_command_str = interpreted_command if interpreted_command else command_input
         
-        if command == "exit":
+        if final_command_str.split()[0] == "exit":
             print("Exiting PyTerm. Goodbye!")
             sys.stdout.flush()
             break
-        elif command == "history":
-            for i, cmd in enumerate(command_history, 1):
-                print(f"{i: >3}: {cmd}")
-            sys.stdout.flush()
-        elif command == "pwd":
-            print(os.getcwd())
-            sys.stdout.flush()
-        elif command == "ls":
-            try:
-                items = os.listdir('.')
-                for item in items:
-                    print(item)
-            except Exception as e:
-                print(f"Error: {e}")
-            sys.stdout.flush()
-        elif command == "cd":
-            try:
-                if not args:
-                    os.chdir(os.path.expanduser('~'))
-                else:
-                    os.chdir(args[0])
-            except FileNotFoundError:
-                print(f"Error: Directory not found: {args[0]}")
-                sys.stdout.flush()
-            except Exception as e:
-                print(f"Error: {e}")
-                sys.stdout.flush()
-        elif command == "mkdir":
-            try:
-                os.mkdir(args[0])
-                print(f"Directory '{args[0]}' created.")
-            except IndexError:
-                print("Error: Please specify a directory name.")
-            except FileExistsError:
-                print(f"Error: Directory already exists: {args[0]}")
-            except Exception as e:
-                print(f"Error: {e}")
-            sys.stdout.flush()
-        elif command == "rm":
-            try:
-                path_to_remove = args[0]
-                if os.path.isfile(path_to_remove):
-                    os.remove(path_to_remove)
-                    print(f"File '{path_to_remove}' removed.")
-                elif os.path.isdir(path_to_remove):
-                    shutil.rmtree(path_to_remove)
-                    print(f"Directory '{path_to_remove}' removed.")
-                else:
-                    print(f"Error: File or directory not found: {path_to_remove}")
-            except IndexError:
-                print("Error: Please specify a file or directory to remove.")
-            except Exception as e:
-                print(f"Error: {e}")
-            sys.stdout.flush()
-        elif command == "sysinfo":
-            try:
-                print("--- System Information (Windows) ---")
-                cpu_command = "powershell \"Get-CimInstance Win32_Processor | Select-Object -ExpandProperty LoadPercentage\""
-                cpu_result = subprocess.run(cpu_command, shell=True, capture_output=True, text=True)
-                if cpu_result.returncode == 0 and cpu_result.stdout.strip():
-                    print(f"CPU Usage: {cpu_result.stdout.strip()}%")
-                else:
-                    print("CPU Usage: Could not retrieve.")
-                mem_command = "powershell \"$mem = Get-CimInstance Win32_OperatingSystem; [math]::Round((($mem.TotalVisibleMemorySize - $mem.FreePhysicalMemory) / $mem.TotalVisibleMemorySize) * 100, 2)\""
-                mem_result = subprocess.run(mem_command, shell=True, capture_output=True, text=True)
-                if mem_result.returncode == 0 and mem_result.stdout.strip():
-                     print(f"Memory Usage: {mem_result.stdout.strip()}%")
-                else:
-                    print("Memory Usage: Could not retrieve.")
-            except Exception as e:
-                print(f"Error: Could not fetch system info using PowerShell.")
-            sys.stdout.flush()
-        else:
-            print(f"Error: Command '{command}' not found.")
+
+        # Long-running commands (find, du, tree, rm of big trees) print as they go
+        for result in fs.execute_command_stream(final_command_str):
+            if result["output"] == "CLEAR_TERMINAL":
+                print("\033[2J\033[H", end="")
+            elif result["output"]:
+                print(result["output"])
+            if result.get("more"):
+                print(f"-- more: run '{result['more']}' --")
+            if result["error"]:
+                print(result["error"])
             sys.stdout.flush()
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""Request latency metrics.
+
+Each /execute request is split into stages - session (lookup and saving of
+the session), interpret (natural language interpretation), handler (the
+command itself) and serialize (building the JSON response) - and the time of
+each stage is recorded in a fixed-bucket histogram labelled by stage, command
+name and session mode. Command outcomes are counted by success and error.
+
+Recording is a bisect and a few integer additions under a lock, cheap enough
+to leave on. The data is exported in the Prometheus text format on /metrics
+and summarised by the `stats` command.
+"""
+import threading
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGES = ("session", "interpret", "handler", "serialize")
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Stage histograms and outcome counters of this process"""
+
+    def __init__(self):
+        self.histograms = {}  # (stage, command, mode) -> Histogram
+        self.outcomes = {}  # (command, mode, status) -> count
+        self._lock = threading.Lock()
+
+    def observe(self, stage, command, mode, seconds):
+        key = (stage, command, mode)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, command, mode, success):
+        key = (command, mode, "success" if success else "error")
+        with self._lock:
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.outcomes.clear()
+
+    def _snapshot(self):
+        with self._lock:
+            histograms = {}
+            for key, histogram in self.histograms.items():
+                copy = Histogram()
+                copy.counts = list(histogram.counts)
+                copy.sum = histogram.sum
+                copy.count = histogram.count
+                histograms[key] = copy
+            return histograms, dict(self.outcomes)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        histograms, outcomes = self._snapshot()
+        lines = [
+            "# HELP pyterm_stage_seconds Time spent in each stage of a command request",
+            "# TYPE pyterm_stage_seconds histogram",
+        ]
+        for (stage, command, mode), histogram in sorted(histograms.items()):
+            labels = f'stage="{stage}",command="{escape(command)}",mode="{escape(mode)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'pyterm_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'pyterm_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"pyterm_stage_seconds_sum{{{labels}}} {histogram.sum:.9f}")
+            lines.append(f"pyterm_stage_seconds_count{{{labels}}} {histogram.count}")
+        lines.append("# HELP pyterm_commands_total Commands run, by outcome")
+        lines.append("# TYPE pyterm_commands_total counter")
+        for (command, mode, status), count in sorted(outcomes.items()):
+            lines.append(f'pyterm_commands_total{{command="{escape(command)}",mode="{escape(mode)}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Per-command table of runs, errors and stage latencies for the stats command"""
+        histograms, outcomes = self._snapshot()
+        by_command = {}
+        for (command, mode, status), count in outcomes.items():
+            runs = by_command.setdefault(command, {"success": 0, "error": 0})
+            runs[status] += count
+        if not by_command:
+            return "(no commands recorded yet)"
+
+        def stage_text(command, stage):
+            merged = Histogram()
+            for (s, c, _), histogram in histograms.items():
+                if s == stage and c == command:
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.count += histogram.count
+                    merged.sum += histogram.sum
+            if not merged.count:
+                return "-"
+            return f"{format_seconds(merged.sum / merged.count)} avg, p99 <= {format_seconds(merged.quantile(0.99))}"
+
+        lines = []
+        for command in sorted(by_command):
+            runs = by_command[command]
+            lines.append(f"{command}: {runs['success'] + runs['error']} runs, {runs['error']} errors")
+            for stage in STAGES:
+                lines.append(f"  {stage:<10} {stage_text(command, stage)}")
+        return "\n".join(lines)
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_seconds(seconds):
+    if seconds == float("inf"):
+        return "inf"
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+# Metrics of this process, shared by the web app, the command handlers and the CLI
+metrics = Metrics()
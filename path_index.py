@@ -0,0 +1,148 @@
+"""Per-session index of known directories, used to resolve partial cd targets.
+
+cd (and natural language like "go to the reports folder") accepts a name that
+is not a directory below the current one; it is then looked up here instead
+of searching the disk. The index learns directories from the session's own
+commands: ls adds the subdirectories it lists, cd and mkdir add their target,
+rm drops the removed tree. The first lookup also seeds it with a shallow,
+bounded walk of the base directory.
+
+Lookups try, in order: exact name, name prefix (bisect over the sorted names)
+and fuzzy name match (shared trigrams). Matches are ranked by how close they
+are to the current directory. The index holds at most PYTERM_PATH_INDEX_SIZE
+directories; the least recently used are dropped first.
+"""
+import bisect
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from walk import Walk
+
+PATH_INDEX_SIZE = int(os.environ.get('PYTERM_PATH_INDEX_SIZE', 5000))
+PATH_INDEX_SEED_DEPTH = int(os.environ.get('PYTERM_PATH_INDEX_SEED_DEPTH', 3))
+FUZZY_MIN_SCORE = 0.5  # share of the query's trigrams a fuzzy match must contain
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PathIndex:
+    """Directories known to one session, searchable by name"""
+
+    def __init__(self, max_paths=PATH_INDEX_SIZE):
+        self.max_paths = max(1, max_paths)
+        self.seeded = False
+        self._paths = OrderedDict()  # path -> lowercase name, least recently used first
+        self._by_name = {}  # lowercase name -> set of paths
+        self._names = []  # sorted lowercase names, for prefix lookups
+        self._grams = {}  # trigram -> set of lowercase names
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return path in self._paths
+
+    def add(self, path):
+        """Remember a directory, or mark it as recently used"""
+        path = os.path.abspath(path)
+        name = os.path.basename(path).lower()
+        if not name:
+            return
+        with self._lock:
+            if path in self._paths:
+                self._paths.move_to_end(path)
+                return
+            self._paths[path] = name
+            paths = self._by_name.get(name)
+            if paths is None:
+                paths = self._by_name[name] = set()
+                bisect.insort(self._names, name)
+                for gram in trigrams(name):
+                    self._grams.setdefault(gram, set()).add(name)
+            paths.add(path)
+            while len(self._paths) > self.max_paths:
+                self._discard(next(iter(self._paths)))
+
+    def _discard(self, path):
+        name = self._paths.pop(path, None)
+        if name is None:
+            return
+        paths = self._by_name[name]
+        paths.discard(path)
+        if not paths:
+            del self._by_name[name]
+            del self._names[bisect.bisect_left(self._names, name)]
+            for gram in trigrams(name):
+                names = self._grams[gram]
+                names.discard(name)
+                if not names:
+                    del self._grams[gram]
+
+    def remove_tree(self, path):
+        """Forget a directory and everything below it (after rm)"""
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for known in [p for p in self._paths if p == path or p.startswith(prefix)]:
+                self._discard(known)
+
+    def seed(self, storage, top):
+        """Add the directories near top, with a shallow walk bounded by the index size"""
+        self.seeded = True
+        walk = Walk(storage, top, max_depth=PATH_INDEX_SEED_DEPTH, max_entries=self.max_paths * 4)
+        try:
+            for _, entry, is_dir, _ in walk:
+                if is_dir:
+                    self.add(entry.path)
+        except OSError:
+            pass
+
+    def _matching_names(self, query):
+        """Names matching query with a score: exact, else by prefix, else fuzzy by shared trigrams"""
+        if query in self._by_name:
+            return {query: 1.0}
+        start = bisect.bisect_left(self._names, query)
+        end = bisect.bisect_left(self._names, query + "\uffff", start)
+        if start < end:
+            return dict.fromkeys(self._names[start:end], 1.0)
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        scores = {name: count / len(grams) for name, count in shared.items()}
+        return {name: score for name, score in scores.items() if score >= FUZZY_MIN_SCORE}
+
+    def lookup(self, query, near, limit=5):
+        """Known directories whose name matches query, closest to the directory near first.
+
+        A query with several components ("projects/web") matches on its last one
+        and keeps the directories whose path ends with the rest.
+        """
+        query = query.strip(os.sep).lower()
+        if not query:
+            return []
+        parent, _, name = query.rpartition(os.sep)
+        near_parts = os.path.abspath(near).split(os.sep)
+        with self._lock:
+            scores = self._matching_names(name)
+            candidates = [(score, path) for match, score in scores.items() for path in self._by_name[match]]
+        if parent:
+            candidates = [(s, p) for s, p in candidates if os.path.dirname(p).lower().endswith(os.sep + parent)]
+
+        def rank(candidate):
+            score, path = candidate
+            parts = path.split(os.sep)
+            common = 0
+            for a, b in zip(parts, near_parts):
+                if a != b:
+                    break
+                common += 1
+            # Better match first; then below the current directory, fewer steps away, shorter
+            return (-score, common < len(near_parts), len(parts) + len(near_parts) - 2 * common, len(path), path)
+
+        return [path for _, path in sorted(candidates, key=rank)[:limit]]
@@ -0,0 +1,131 @@
+"""On-demand sampling profiler for a running server.
+
+While active, a background thread takes a snapshot of every thread's Python
+stack (sys._current_frames()) every PYTERM_PROFILE_INTERVAL seconds. Stacks
+that run through PyTerm's own code are counted, so idle server threads are
+left out. When the run ends, the counts are written as collapsed stacks (one
+"frame;frame;frame count" line per stack), the input format of flamegraph.pl
+and speedscope.
+
+Frames are labelled module:qualname, so a command shows up as
+filesystem:FileSystemManager.execute_command;commands:dispatch;...;commands:cmd_ls
+and interpretation as main:cached_interpret_command;main:interpret_command.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+PROFILE_INTERVAL = float(os.environ.get('PYTERM_PROFILE_INTERVAL', 0.01))
+PROFILE_DIR = os.environ.get('PYTERM_PROFILE_DIR') or tempfile.gettempdir()
+# Threads that always have PyTerm frames on their stack but never serve requests
+IGNORED_THREADS = {"pyterm-metrics", "pyterm-profiler"}
+
+ROOT = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads of this process for a limited time"""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.running = False
+        self.started_at = None
+        self.seconds = 0
+        self.output = None
+        self.error = None
+        self._labels = {}  # code object -> frame label
+        self._lock = threading.Lock()
+
+    def start(self, seconds, output_dir=None):
+        """Profile for the given number of seconds in the background; returns the output path"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running")
+            self.running = True
+            self.stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.seconds = seconds
+            self.error = None
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+            self.output = os.path.join(output_dir or PROFILE_DIR, f"pyterm-profile-{os.getpid()}-{stamp}.folded")
+        threading.Thread(target=self._run, name="pyterm-profiler", daemon=True).start()
+        return self.output
+
+    def _run(self):
+        try:
+            deadline = time.monotonic() + self.seconds
+            while time.monotonic() < deadline:
+                self.sample()
+                time.sleep(self.interval)
+            self.write(self.output)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.running = False
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = self._labels[code] = f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+        return label
+
+    def sample(self):
+        """Record the current stack of every thread running PyTerm code"""
+        own = threading.get_ident()
+        ignored = {t.ident for t in threading.enumerate() if t.name in IGNORED_THREADS}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own or ident in ignored:
+                continue
+            stack = []
+            ours = False
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename.startswith(ROOT) and "site-packages" not in code.co_filename:
+                    ours = True
+                stack.append(self._label(code))
+                frame = frame.f_back
+            if ours:
+                stacks.append(";".join(reversed(stack)))
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def write(self, path):
+        """Write the collected stacks in collapsed-stack format"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, n=10):
+        """Functions with the most samples at the top of the stack"""
+        leaves = Counter()
+        with self._lock:
+            items = list(self.stacks.items())
+        for stack, count in items:
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def status(self):
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "output": self.output,
+            "error": self.error,
+            "top": [{"frame": frame, "samples": count} for frame, count in self.top()],
+        }
+
+
+# Profiler of this process; each gunicorn worker profiles only itself
+profiler = SamplingProfiler()
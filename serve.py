@@ -0,0 +1,90 @@
+"""Serving modes for the web app, selected with PYTERM_SERVER.
+
+- dev:      Flask's built-in development server (threaded); the default
+- waitress: multi-threaded production WSGI server, works on every platform
+- gunicorn: pre-forked worker processes with threads (Linux/macOS only)
+
+Worker processes, threads and keep-alive are configured with PYTERM_WORKERS,
+PYTERM_THREADS and PYTERM_KEEPALIVE. SANDBOX file trees live in the memory (or
+temporary directory) of the process that created them, so where sessions are
+sandboxes gunicorn always runs a single worker with threads.
+"""
+import multiprocessing
+import os
+import sys
+
+from filesystem import is_serverless_environment
+
+SANDBOX_SESSIONS = bool(is_serverless_environment())
+SERVER = os.environ.get('PYTERM_SERVER', 'dev').lower()
+WORKERS = int(os.environ.get('PYTERM_WORKERS', 1 if SANDBOX_SESSIONS else min(4, multiprocessing.cpu_count())))
+THREADS = int(os.environ.get('PYTERM_THREADS', 8))
+KEEPALIVE = int(os.environ.get('PYTERM_KEEPALIVE', 5))
+TIMEOUT = int(os.environ.get('PYTERM_TIMEOUT', 30))
+
+
+def run_dev(app, host, port):
+    app.run(debug=False, host=host, port=port, threaded=True)
+
+
+def run_waitress(app, host, port):
+    try:
+        from waitress import serve
+    except ImportError:
+        sys.exit("PYTERM_SERVER=waitress requires the 'waitress' package (pip install waitress)")
+    # channel_timeout closes idle keep-alive connections
+    serve(app, host=host, port=port, threads=THREADS, channel_timeout=max(KEEPALIVE, 1), ident="PyTerm")
+
+
+def run_gunicorn(app, host, port):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("PYTERM_SERVER=gunicorn requires the 'gunicorn' package (pip install gunicorn)")
+
+    workers = WORKERS
+    if workers > 1 and SANDBOX_SESSIONS:
+        # No backend shares sandbox contents, so a session must stay on one process
+        print(f"Warning: SANDBOX sessions keep their files in one process; running 1 worker "
+              f"instead of {workers} (raise PYTERM_THREADS for more concurrency)", file=sys.stderr)
+        workers = 1
+    if SANDBOX_SESSIONS and os.environ.get('PYTERM_SESSION_BACKEND', 'memory').lower() != 'memory':
+        print("Note: sessions are SANDBOX here; the shared session backend does not share their files",
+              file=sys.stderr)
+    elif workers > 1 and os.environ.get('PYTERM_SESSION_BACKEND', 'memory').lower() == 'memory':
+        print("Warning: sessions are per worker process; set PYTERM_SESSION_BACKEND=sqlite "
+              "so every worker sees the same session state", file=sys.stderr)
+
+    class PyTermApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "threads": THREADS,
+                "worker_class": "gthread",
+                "keepalive": KEEPALIVE,
+                "timeout": TIMEOUT,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    PyTermApplication().run()
+
+
+SERVERS = {
+    "dev": run_dev,
+    "waitress": run_waitress,
+    "gunicorn": run_gunicorn,
+}
+
+
+def run(app, host='0.0.0.0', port=None, server=None):
+    """Serve the app with the configured server"""
+    port = port or int(os.environ.get('PORT', 5000))
+    server = (server or SERVER).lower()
+    if server not in SERVERS:
+        sys.exit(f"Unknown PYTERM_SERVER '{server}' (choose from {', '.join(SERVERS)})")
+    SERVERS[server](app, host, port)
@@ -0,0 +1,138 @@
+"""Session state shared between worker processes.
+
+FileSystemManager objects live in each worker's memory. When the app runs
+with several workers, the part of a session that must follow the user -
+current directory, mode and command history - is also written to a state
+backend, and a worker loads it before handling a request.
+
+This covers REAL OS sessions, whose files are on the shared disk. The files
+of a SANDBOX session exist only in the worker process that created them, so
+sandbox deployments run a single worker (see serve.py). Sessions are
+SANDBOX whenever the temp directory is under /tmp, which is true on nearly
+every Linux host, so there the backend only keeps state across restarts of
+that one worker.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class SessionStateBackend:
+    """Interface of a shared session state store"""
+
+    def load(self, session_id):
+        """Return {"current_dir", "mode", "history_len"} for a session, or None if unknown"""
+        raise NotImplementedError
+
+    def history_since(self, session_id, start):
+        """Return the session's history entries from index start onwards"""
+        raise NotImplementedError
+
+    def save(self, session_id, current_dir, mode, new_history):
+        """Store the session's directory and mode and append new history entries"""
+        raise NotImplementedError
+
+    def delete_expired(self, max_age):
+        """Forget sessions not saved for max_age seconds"""
+        raise NotImplementedError
+
+
+class SQLiteSessionState(SessionStateBackend):
+    """Session state in a local SQLite database (WAL mode) shared by all workers on a host"""
+
+    PRUNE_INTERVAL = 600  # seconds between deletions of expired sessions
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.environ.get('PYTERM_SESSION_DB') or os.path.join(tempfile.gettempdir(), 'pyterm-sessions.db')
+        self.ttl = ttl if ttl is not None else float(os.environ.get('PYTERM_SESSION_TTL', 3600))
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    current_dir TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    history_len INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    command TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS history_session ON history (session_id, id);
+            """)
+
+    def _connection(self):
+        # One connection per thread (and per process, since threads don't survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            'SELECT current_dir, mode, history_len FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"current_dir": row[0], "mode": row[1], "history_len": row[2]}
+
+    def history_since(self, session_id, start):
+        rows = self._connection().execute(
+            'SELECT command FROM history WHERE session_id = ? ORDER BY id LIMIT -1 OFFSET ?', (session_id, start)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def save(self, session_id, current_dir, mode, new_history):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO sessions (session_id, current_dir, mode, history_len, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(session_id) DO UPDATE SET current_dir = excluded.current_dir, mode = excluded.mode, '
+                'history_len = history_len + excluded.history_len, updated_at = excluded.updated_at',
+                (session_id, current_dir, mode, len(new_history), time.time())
+            )
+            if new_history:
+                conn.executemany(
+                    'INSERT INTO history (session_id, command) VALUES (?, ?)',
+                    [(session_id, command) for command in new_history]
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if self.ttl > 0 and time.monotonic() - self._last_prune > self.PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            self.delete_expired(self.ttl)
+
+    def delete_expired(self, max_age):
+        conn = self._connection()
+        cutoff = time.time() - max_age
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM history WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)', (cutoff,))
+            conn.execute('DELETE FROM sessions WHERE updated_at < ?', (cutoff,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def create_state_backend(name=None):
+    """Backend selected by PYTERM_SESSION_BACKEND: 'memory' (default, per-process only) or 'sqlite'"""
+    name = (name or os.environ.get('PYTERM_SESSION_BACKEND', 'memory')).lower()
+    if name == 'sqlite':
+        return SQLiteSessionState()
+    if name == 'memory':
+        return None
+    raise ValueError(f"Unknown PYTERM_SESSION_BACKEND: {name}")
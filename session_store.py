@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """Bounded mapping of session id -> FileSystemManager with LRU and idle TTL eviction"""
+
+    def __init__(self, max_sessions=None, ttl=None):
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.environ.get('PYTERM_MAX_SESSIONS', 1000))
+        self.ttl = ttl if ttl is not None else float(os.environ.get('PYTERM_SESSION_TTL', 3600))
+        self._sessions = OrderedDict()  # session_id -> (manager, last_used), oldest first
+        self._lock = threading.Lock()
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    def get_or_create(self, session_id, factory):
+        """Return the session for session_id, creating it with factory() if needed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = self._pop_expired(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                manager = factory()
+            else:
+                manager = entry[0]
+            self._sessions[session_id] = (manager, now)
+
+            while len(self._sessions) > self.max_sessions:
+                _, (old, _) = self._sessions.popitem(last=False)
+                expired.append(old)
+                self.evicted_lru += 1
+
+        self._cleanup(expired)
+        return manager
+
+    def get(self, session_id):
+        """Return the session for session_id without creating one (None if missing)"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[0] if entry else None
+
+    def remove(self, session_id):
+        """Drop a session and clean up its resources"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry:
+            self._cleanup([entry[0]])
+
+    def evict_expired(self):
+        """Evict all sessions idle for longer than the TTL"""
+        with self._lock:
+            expired = self._pop_expired(time.monotonic())
+        self._cleanup(expired)
+        return len(expired)
+
+    def _pop_expired(self, now):
+        # Entries are kept in last-used order, so expired ones are always at the front
+        expired = []
+        if self.ttl <= 0:
+            return expired
+        while self._sessions:
+            session_id, (manager, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+            expired.append(manager)
+            self.evicted_ttl += 1
+        return expired
+
+    def _cleanup(self, managers):
+        """Release evicted sessions off the request thread"""
+        if not managers:
+            return
+        thread = threading.Thread(target=_cleanup_sessions, args=(managers,), daemon=True)
+        thread.start()
+
+    def stats(self):
+        """Get session counts and eviction totals"""
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "evicted_lru": self.evicted_lru,
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_total": self.evicted_lru + self.evicted_ttl,
+            }
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+
+def _cleanup_sessions(managers):
+    for manager in managers:
+        try:
+            manager.cleanup()
+        except Exception:
+            pass
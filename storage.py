@@ -0,0 +1,388 @@
+"""Storage backends used by FileSystemManager.
+
+Command handlers never touch os.* directly for file system state; they go
+through the session's storage object. DiskStorage is the real file system,
+MemoryStorage is a throwaway in-memory tree used for SANDBOX sessions.
+
+Both expose the same small interface: scandir(), exists(), isdir(), isfile(),
+makedirs(), remove(), rmtree() and cleanup(). MemoryStorage.scandir() yields
+entries that behave like os.DirEntry (name, path, is_dir(), is_file(),
+is_symlink(), stat()).
+"""
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+SANDBOX_STORAGE = os.environ.get('PYTERM_SANDBOX_STORAGE', 'memory')
+SANDBOX_QUOTA = int(os.environ.get('PYTERM_SANDBOX_QUOTA', 4 * 1024 * 1024))
+# Virtual mount point of in-memory sandboxes; nothing is ever created there
+SANDBOX_ROOT = os.path.abspath(os.sep + 'sandbox')
+
+
+class DiskStorage:
+    """Real file system; optionally owns a temporary root that is deleted on cleanup"""
+
+    on_disk = True
+
+    def __init__(self, root=None, temporary=False):
+        self.temporary = temporary
+        self.root = tempfile.mkdtemp() if temporary else root
+
+    def scandir(self, path):
+        return os.scandir(path)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def makedirs(self, path, exist_ok=False):
+        os.makedirs(path, exist_ok=exist_ok)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def rmtree(self, path):
+        shutil.rmtree(path)
+
+    def usage(self):
+        return None
+
+    def cleanup(self):
+        if self.temporary:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+class Node:
+    """A file or directory of an in-memory tree; files have children=None.
+
+    owner is the MemoryStorage allowed to modify the node in place. Nodes of the
+    shared base tree have no owner and are never modified.
+    """
+
+    __slots__ = ("children", "size", "mtime_ns", "owner")
+
+    def __init__(self, is_dir=True, size=0, owner=None):
+        self.children = {} if is_dir else None
+        self.size = size
+        self.mtime_ns = time.time_ns()
+        self.owner = owner
+
+    def copy(self, owner):
+        """Shallow copy for copy-on-write: children are shared until they are modified"""
+        node = Node(self.children is not None, self.size, owner)
+        if self.children is not None:
+            node.children = dict(self.children)
+        node.mtime_ns = self.mtime_ns
+        return node
+
+
+# Rough bytes charged against the quota for every node: the node, its children
+# dict and the key string in its parent, plus the length of its name
+NODE_COST = sys.getsizeof(Node()) + sys.getsizeof({}) + sys.getsizeof("")
+
+
+class MemoryStat:
+    __slots__ = ("st_size", "st_mtime_ns", "st_mtime", "st_mode")
+
+    def __init__(self, node):
+        self.st_size = node.size
+        self.st_mtime_ns = node.mtime_ns
+        self.st_mtime = node.mtime_ns / 1e9
+        self.st_mode = 0o040755 if node.children is not None else 0o100644
+
+
+class MemoryEntry:
+    """os.DirEntry look-alike for MemoryStorage.scandir()"""
+
+    __slots__ = ("name", "path", "_node")
+
+    def __init__(self, name, path, node):
+        self.name = name
+        self.path = path
+        self._node = node
+
+    def is_dir(self, follow_symlinks=True):
+        return self._node.children is not None
+
+    def is_file(self, follow_symlinks=True):
+        return self._node.children is None
+
+    def is_symlink(self):
+        return False
+
+    def stat(self, follow_symlinks=True):
+        return MemoryStat(self._node)
+
+
+class _EntryIterator:
+    """Context-manager iterator, like the object returned by os.scandir()"""
+
+    def __init__(self, entries):
+        self._entries = iter(entries)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+
+class MemoryStorage:
+    """In-memory directory tree with a per-session memory quota; never touches the disk.
+
+    Every session starts from the shared read-only base tree without copying it.
+    Changes are copy-on-write: before a directory is modified, it and its
+    ancestors are shallow-copied into the session, so unchanged subtrees stay
+    shared by all sessions. Only nodes owned by the session count towards its quota.
+    """
+
+    on_disk = False
+
+    def __init__(self, root=SANDBOX_ROOT, quota=SANDBOX_QUOTA, base=None):
+        self.root = root
+        self.quota = quota
+        self.base = base if base is not None else get_base_tree()
+        self.used = 0
+        self.tree = self.base
+        self._lock = threading.RLock()
+
+    def _parts(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir:
+            return []
+        parts = rel.split(os.sep)
+        if parts[0] == os.pardir:
+            raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+        return parts
+
+    def _lookup(self, path):
+        node = self.tree
+        for part in self._parts(path):
+            if node.children is None:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _charge(self, cost):
+        if self.used + cost > self.quota:
+            raise OSError(errno.ENOSPC, f"Sandbox storage quota exceeded ({self.quota // 1024} KB)")
+        self.used += cost
+
+    def _writable(self, parts, path):
+        """Return the directory at parts, copying it and its ancestors into this session if shared"""
+        if self.tree.owner is not self:
+            self._charge(NODE_COST)
+            self.tree = self.tree.copy(self)
+        node = self.tree
+        for part in parts:
+            child = node.children.get(part) if node.children is not None else None
+            if child is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+            if child.children is None:
+                raise NotADirectoryError(errno.ENOTDIR, "Not a directory", path)
+            if child.owner is not self:
+                self._charge(NODE_COST + len(part))
+                child = node.children[part] = child.copy(self)
+            node = child
+        return node
+
+    def scandir(self, path):
+        with self._lock:
+            node = self._lookup(path)
+            if node is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+            if node.children is None:
+                raise NotADirectoryError(errno.ENOTDIR, "Not a directory", path)
+            # Snapshot so concurrent changes don't break the iteration
+            entries = [MemoryEntry(name, os.path.join(path, name), child) for name, child in node.children.items()]
+        return _EntryIterator(entries)
+
+    def exists(self, path):
+        try:
+            return self._lookup(path) is not None
+        except FileNotFoundError:
+            return False
+
+    def isdir(self, path):
+        try:
+            node = self._lookup(path)
+        except FileNotFoundError:
+            return False
+        return node is not None and node.children is not None
+
+    def isfile(self, path):
+        try:
+            node = self._lookup(path)
+        except FileNotFoundError:
+            return False
+        return node is not None and node.children is None
+
+    def stat(self, path):
+        node = self._lookup(path)
+        if node is None:
+            raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+        return MemoryStat(node)
+
+    def makedirs(self, path, exist_ok=False):
+        with self._lock:
+            parts = self._parts(path)
+            # Find the deepest existing directory without copying anything
+            node = self.tree
+            depth = 0
+            for part in parts:
+                if node.children is None:
+                    raise NotADirectoryError(errno.ENOTDIR, "Not a directory", path)
+                child = node.children.get(part)
+                if child is None:
+                    break
+                node = child
+                depth += 1
+            if depth == len(parts):
+                if exist_ok and node.children is not None:
+                    return
+                raise FileExistsError(errno.EEXIST, "File exists", path)
+            if node.children is None:
+                raise NotADirectoryError(errno.ENOTDIR, "Not a directory", path)
+
+            node = self._writable(parts[:depth], path)
+            for part in parts[depth:]:
+                self._charge(NODE_COST + len(part))
+                child = node.children[part] = Node(owner=self)
+                node.mtime_ns = child.mtime_ns
+                node = child
+
+    def _detach(self, path):
+        parts = self._parts(path)
+        if not parts:
+            raise PermissionError(errno.EPERM, "Cannot remove the sandbox root", path)
+        if self._lookup(path) is None:
+            raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+        parent = self._writable(parts[:-1], path)
+        parent.mtime_ns = time.time_ns()
+        return parts[-1], parent.children.pop(parts[-1])
+
+    def remove(self, path):
+        with self._lock:
+            node = self._lookup(path)
+            if node is not None and node.children is not None:
+                raise IsADirectoryError(errno.EISDIR, "Is a directory", path)
+            name, node = self._detach(path)
+            self.used -= self._owned_cost(name, node)
+
+    def rmtree(self, path):
+        with self._lock:
+            name, node = self._detach(path)
+            self.used -= self._owned_cost(name, node)
+
+    def _owned_cost(self, name, node):
+        """Quota charged for the session-owned nodes of a subtree.
+
+        Shared nodes were never charged, and a shared node has no owned descendants.
+        """
+        cost = 0
+        stack = [(name, node)]
+        while stack:
+            name, node = stack.pop()
+            if node.owner is not self:
+                continue
+            cost += NODE_COST + len(name) + node.size
+            if node.children:
+                stack.extend(node.children.items())
+        return cost
+
+    def usage(self):
+        return {"used": self.used, "quota": self.quota}
+
+    def cleanup(self):
+        self.tree = self.base
+        self.used = 0
+
+
+# Contents of the shared sandbox base tree when PYTERM_SANDBOX_BASE is not set.
+# Directories are dicts, files are sizes in bytes.
+DEMO_TREE = {
+    "documents": {
+        "notes.txt": 1342,
+        "todo.txt": 268,
+        "reports": {"q1-summary.txt": 4096, "q2-summary.txt": 3870},
+    },
+    "downloads": {"installer.zip": 7340032},
+    "pictures": {"vacation": {"beach.jpg": 2203648, "sunset.jpg": 1867776}},
+    "projects": {
+        "pyterm": {"app.py": 12288, "main.py": 6144, "README.md": 5120},
+        "website": {"index.html": 2048, "style.css": 1024},
+    },
+    "README.txt": 512,
+}
+
+_base_tree = None
+_base_tree_lock = threading.Lock()
+
+
+def build_tree(spec):
+    """Build a read-only node tree from a nested dict of directories and file sizes"""
+    node = Node()
+    for name, child in spec.items():
+        node.children[name] = build_tree(child) if isinstance(child, dict) else Node(is_dir=False, size=child)
+    return node
+
+
+def load_tree(path):
+    """Build a read-only node tree mirroring a directory on disk (names and sizes only)"""
+    node = Node()
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                node.children[entry.name] = load_tree(entry.path)
+            else:
+                node.children[entry.name] = Node(is_dir=False, size=entry.stat(follow_symlinks=False).st_size)
+    return node
+
+
+def get_base_tree():
+    """The shared sandbox base tree, built once per process.
+
+    PYTERM_SANDBOX_BASE may name a directory to mirror, or 'none' for an empty sandbox.
+    """
+    global _base_tree
+    if _base_tree is None:
+        with _base_tree_lock:
+            if _base_tree is None:
+                source = os.environ.get('PYTERM_SANDBOX_BASE', '')
+                if source.lower() == 'none':
+                    _base_tree = Node()
+                elif source:
+                    _base_tree = load_tree(source)
+                else:
+                    _base_tree = build_tree(DEMO_TREE)
+    return _base_tree
+
+
+def sandbox_storage():
+    """Storage for a new SANDBOX session, selected by PYTERM_SANDBOX_STORAGE"""
+    if SANDBOX_STORAGE == 'disk':
+        return DiskStorage(temporary=True)
+    return MemoryStorage()
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psutil
+
+# Averaging windows (seconds) reported by sysinfo
+WINDOWS = (1, 10, 60)
+
+
+class MetricsSampler:
+    """Background thread that keeps a rolling window of CPU, memory and disk samples.
+
+    Readers never block: snapshot() only looks at samples that were already taken.
+    """
+
+    def __init__(self, interval=None, disk_path=None):
+        self.interval = interval if interval is not None else float(os.environ.get('PYTERM_SAMPLE_INTERVAL', 1.0))
+        self.disk_path = disk_path or os.path.abspath(os.sep)
+        self.samples = deque(maxlen=int(max(WINDOWS) / self.interval) + 1)
+        self.process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        # The first cpu_percent(None) call only sets the reference point
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent(interval=None)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pyterm-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples.append(self._sample())
+            except Exception:
+                pass
+
+    def _sample(self):
+        memory = psutil.virtual_memory()
+        return {
+            "time": time.time(),
+            "cpu": psutil.cpu_percent(interval=None),
+            "process_cpu": self.process.cpu_percent(interval=None),
+            "memory": memory.percent,
+            "memory_available": memory.available,
+            "process_rss": self.process.memory_info().rss,
+            "disk": psutil.disk_usage(self.disk_path).percent,
+        }
+
+    def snapshot(self):
+        """Get the latest sample plus averages over each window (None until the first sample)"""
+        samples = list(self.samples)
+        if not samples:
+            return None
+        latest = dict(samples[-1])
+        latest["averages"] = {}
+        for window in WINDOWS:
+            recent = samples[-max(1, int(round(window / self.interval))):]
+            latest["averages"][window] = {
+                key: sum(s[key] for s in recent) / len(recent)
+                for key in ("cpu", "process_cpu", "memory")
+            }
+        latest["age"] = time.time() - latest["time"]
+        return latest
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """Get the process-wide sampler, starting it on first use"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                sampler = MetricsSampler()
+                sampler.start()
+                _sampler = sampler
+    return _sampler
@@ -0,0 +1,178 @@
+"""Recursive directory walking for find, du and tree.
+
+Walks go through the session's storage, so they work on the real disk and on
+in-memory sandboxes alike. On disk, directories are scanned by a shared
+thread pool so several scandir() calls are in flight at once; in-memory trees
+are walked inline, where threads would only add overhead.
+
+Every walk has a depth limit and an entry limit, and only keeps a bounded
+number of directory scans in flight, so memory stays bounded by the largest
+single directory rather than the size of the tree.
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+WALK_WORKERS = int(os.environ.get('PYTERM_WALK_WORKERS', 8))
+WALK_MAX_ENTRIES = int(os.environ.get('PYTERM_WALK_MAX_ENTRIES', 1000000))
+WALK_MAX_DEPTH = int(os.environ.get('PYTERM_WALK_MAX_DEPTH', 64))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Shared pool scanning directories for all walks, created on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WALK_WORKERS, thread_name_prefix="pyterm-walk")
+    return _executor
+
+
+def scan(storage, path, with_size):
+    """Entries of one directory as (entry, is_dir, size); size is only looked up for files if asked"""
+    results = []
+    with storage.scandir(path) as it:
+        for entry in it:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            size = 0
+            if with_size and not is_dir:
+                size = entry.stat(follow_symlinks=False).st_size
+            results.append((entry, is_dir, size))
+    return results
+
+
+class Walk:
+    """Iterate over (depth, entry, is_dir, size) for everything below top, in no particular order.
+
+    After iteration, truncated tells whether a limit stopped the walk and errors
+    counts directories that could not be read.
+    """
+
+    def __init__(self, storage, top, max_depth=None, max_entries=None, with_size=False):
+        self.storage = storage
+        self.top = top
+        self.max_depth = min(max_depth or WALK_MAX_DEPTH, WALK_MAX_DEPTH)
+        self.max_entries = max_entries or WALK_MAX_ENTRIES
+        self.with_size = with_size
+        self.entries = 0
+        self.errors = 0
+        self.truncated = False
+
+    def __iter__(self):
+        if self.storage.on_disk:
+            return self._walk_parallel()
+        return self._walk_inline()
+
+    def _visit(self, depth, results, pending):
+        """Yield one scanned directory's entries and queue its subdirectories"""
+        for entry, is_dir, size in results:
+            if self.entries >= self.max_entries:
+                self.truncated = True
+                return
+            self.entries += 1
+            yield depth, entry, is_dir, size
+            if is_dir:
+                if depth < self.max_depth:
+                    pending.append((entry.path, depth + 1))
+                else:
+                    self.truncated = True
+
+    def _walk_inline(self):
+        pending = [(self.top, 1)]
+        while pending and self.entries < self.max_entries:
+            path, depth = pending.pop()
+            try:
+                results = scan(self.storage, path, self.with_size)
+            except OSError:
+                if path == self.top:
+                    raise
+                self.errors += 1
+                continue
+            yield from self._visit(depth, results, pending)
+        if pending:
+            self.truncated = True
+
+    def _walk_parallel(self):
+        executor = get_executor()
+        pending = [(self.top, 1)]  # directories found but not scanned yet (depth first keeps this short)
+        running = {}
+        try:
+            while (pending or running) and self.entries < self.max_entries:
+                while pending and len(running) < WALK_WORKERS:
+                    path, depth = pending.pop()
+                    running[executor.submit(scan, self.storage, path, self.with_size)] = (path, depth)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth = running.pop(future)
+                    try:
+                        results = future.result()
+                    except OSError:
+                        if path == self.top:
+                            raise
+                        self.errors += 1
+                        continue
+                    yield from self._visit(depth, results, pending)
+            if pending or running:
+                self.truncated = True
+        finally:
+            # Stopped early (limit reached or the client went away): drop queued scans
+            for future in running:
+                future.cancel()
+
+
+def tree_lines(storage, top, max_depth=None, max_entries=None):
+    """Yield tree-style lines for everything below top, depth first, sorted by name.
+
+    On disk, the next few subdirectories of the directory being printed are
+    scanned ahead by the walker pool while the current one is printed.
+    """
+    max_depth = min(max_depth or WALK_MAX_DEPTH, WALK_MAX_DEPTH)
+    max_entries = max_entries or WALK_MAX_ENTRIES
+    executor = get_executor() if storage.on_disk else None
+    prefetched = {}  # path -> future of its scan
+
+    def listing(path):
+        future = prefetched.pop(path, None)
+        results = future.result() if future is not None else scan(storage, path, False)
+        return sorted(results, key=lambda r: r[0].name)
+
+    count = 0
+    # Per level: [sorted entries, next index, line prefix, depth, next index to prefetch]
+    stack = [[listing(top), 0, "", 1, 0]]
+    try:
+        while stack:
+            level = stack[-1]
+            items, index, prefix, depth = level[:4]
+            if index == len(items):
+                stack.pop()
+                continue
+            level[1] += 1
+
+            if executor is not None and depth < max_depth:
+                while level[4] < len(items) and len(prefetched) < WALK_WORKERS:
+                    ahead, is_ahead_dir, _ = items[level[4]]
+                    if is_ahead_dir and level[4] > index:
+                        prefetched[ahead.path] = executor.submit(scan, storage, ahead.path, False)
+                    level[4] += 1
+
+            if count >= max_entries:
+                yield f"... (stopped after {max_entries} entries)"
+                return
+            count += 1
+            entry, is_dir, _ = items[index]
+            last = index == len(items) - 1
+            yield f"{prefix}{'└── ' if last else '├── '}{entry.name}{'/' if is_dir else ''}"
+            if is_dir and depth < max_depth:
+                child_prefix = prefix + ('    ' if last else '│   ')
+                try:
+                    sub = listing(entry.path)
+                except OSError:
+                    yield f"{child_prefix}[cannot read directory]"
+                    continue
+                stack.append([sub, 0, child_prefix, depth + 1, 0])
+    finally:
+        for future in prefetched.values():
+            future.cancel()